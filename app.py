@@ -43,6 +43,10 @@ try:
 except ImportError as e:
     PANDAS_AVAILABLE = False
 
+from src.product_catalog import ProductCatalog, RankedResults, ResultCursor
+from src.typeahead import PrefixIndex
+from src.fuzzy_match import DeletionIndex
+
 try:
     from config.settings import get_settings
     settings = get_settings()
@@ -54,6 +58,9 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 検索結果を1ページに表示する件数（「もっと見る」で追加表示）
+RESULTS_PAGE_SIZE = 5
+
 st.markdown("""
 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
 <style>
@@ -362,23 +369,6 @@ def initialize_recommendation_engine():
         # 軽量版システムを返す（基本的な機能のみ）
         return None
 
-class BasicSearchResult:
-    """基本検索結果のクラス"""
-    def __init__(self, product_name, effect, ingredient, category, description, url, image_url='', similarity_score=0.0):
-        self.product_name = product_name
-        self.effect = effect
-        self.ingredient = ingredient
-        self.category = category
-        self.description = description
-        self.url = url
-        self.image_url = image_url
-        self.similarity_score = similarity_score
-        self.metadata = {
-            'effect': effect,
-            'ingredient': ingredient,
-            'image_url': image_url
-        }
-
 @st.cache_data
 def load_csv_data():
     """CSVデータを読み込む"""
@@ -393,18 +383,59 @@ def load_csv_data():
         # エラーを静かに処理
         return None
 
+@st.cache_resource
+def load_product_catalog():
+    """検索結果の表示で参照する商品カタログを読み込む（プロセス内で共有）"""
+    try:
+        return ProductCatalog.from_csv("./data/product_recommend.csv")
+    except Exception as e:
+        # エラーを静かに処理
+        return None
+
+@st.cache_resource
+def load_typeahead_index():
+    """入力補完用の前方一致インデックスを構築（プロセス内で共有）"""
+    catalog = load_product_catalog()
+    if catalog is None:
+        return None
+    return PrefixIndex.from_catalog(catalog)
+
+@st.cache_resource
+def load_fuzzy_index():
+    """商品名・有効成分の入力ミス補正用の削除辞書を構築（プロセス内で共有）"""
+    catalog = load_product_catalog()
+    if catalog is None:
+        return None
+    return DeletionIndex.from_catalog(catalog)
+
+def correct_query(query):
+    """商品名・有効成分の入力ミスを補正したクエリ（補正不要ならそのまま）"""
+    fuzzy_index = load_fuzzy_index()
+    if fuzzy_index is None:
+        return query
+    return fuzzy_index.correct_query(query)
+
+def apply_suggestion(term):
+    """補完候補を検索ボックスに反映"""
+    st.session_state['search_input'] = term
+
 def basic_search(query, top_k=5):
     """CSVから基本検索を行う（性病・感染症の検索精度向上）"""
     if not PANDAS_AVAILABLE:
         return []
         
     df = load_csv_data()
-    if df is None:
+    catalog = load_product_catalog()
+    if df is None or catalog is None:
         return []
     
     import re
+    # 「カマグラゴルド」などの入力ミスを補正してから厳密検索・キーワード検索に渡す
+    query = correct_query(query)
     query_lower = query.lower()
-    results = []
+    # ヒットした行番号とスコアのみを保持し、商品情報は表示時にカタログから参照する
+    result_rows = []
+    result_scores = []
     
     # 性病・感染症の厳密な検索マッピング
     strict_std_mapping = {
@@ -487,7 +518,7 @@ def basic_search(query, top_k=5):
             product_name = product_info['product']
             subcategory = product_info['subcategory']
             
-            for _, row in df.iterrows():
+            for row_index, (_, row) in enumerate(df.iterrows()):
                 # ビクシリン・ジェネリックの場合は部分一致を許可
                 is_product_match = False
                 if 'ビクシリン' in product_name:
@@ -519,20 +550,11 @@ def basic_search(query, top_k=5):
                         if subcategory_match:
                             found_products.add(product_name)
                             
-                            result = BasicSearchResult(
-                                product_name=row['商品名'],
-                                effect=row['効果'],
-                                ingredient=row['有効成分'],
-                                category=row['カテゴリ名'],
-                                description=row['説明文'],
-                                url=row['商品URL'],
-                                image_url=row.get('商品画像URL', ''),
-                                similarity_score=100.0  # 厳密一致なので最高スコア
-                            )
-                            results.append(result)
+                            result_rows.append(row_index)
+                            result_scores.append(100.0)  # 厳密一致なので最高スコア
                             break  # この商品は見つかったので次へ
         
-        return results[:top_k]
+        return RankedResults(catalog, result_rows, result_scores)[:top_k]
     
     # サプリメント専用検索の場合
     if is_supplement_search:
@@ -543,7 +565,7 @@ def basic_search(query, top_k=5):
             product_name = product_info['product']
             category = product_info['category']
             
-            for _, row in df.iterrows():
+            for row_index, (_, row) in enumerate(df.iterrows()):
                 # 商品名の部分一致チェック
                 is_product_match = product_name in str(row['商品名'])
                 
@@ -558,20 +580,11 @@ def basic_search(query, top_k=5):
                         
                         found_products.add(product_name)
                         
-                        result = BasicSearchResult(
-                            product_name=row['商品名'],
-                            effect=row['効果'],
-                            ingredient=row['有効成分'],
-                            category=row['カテゴリ名'],
-                            description=row['説明文'],
-                            url=row['商品URL'],
-                            image_url=row.get('商品画像URL', ''),
-                            similarity_score=95.0  # サプリ専用検索スコア
-                        )
-                        results.append(result)
+                        result_rows.append(row_index)
+                        result_scores.append(95.0)  # サプリ専用検索スコア
                         break  # この商品は見つかったので次へ
         
-        return results[:top_k]
+        return RankedResults(catalog, result_rows, result_scores)[:top_k]
     
     # 通常の検索（厳密検索でない場合）
     # 性病・感染症専用の検索キーワード辞書
@@ -583,7 +596,7 @@ def basic_search(query, top_k=5):
     # 重複防止用セット
     found_products = set()
     
-    for _, row in df.iterrows():
+    for row_index, (_, row) in enumerate(df.iterrows()):
         score = 0.0
         search_text = ""
         
@@ -638,21 +651,23 @@ def basic_search(query, top_k=5):
             # 重複チェック - 同じ商品が既に追加されていないかチェック
             if product_name not in found_products:
                 found_products.add(product_name)
-                result = BasicSearchResult(
-                    product_name=product_name,
-                    effect=row['効果'],
-                    ingredient=row['有効成分'],
-                    category=row['カテゴリ名'],
-                    description=row['説明文'],
-                    url=row['商品URL'],
-                    image_url=row.get('商品画像URL', ''),
-                    similarity_score=score
-                )
-                results.append(result)
+                result_rows.append(row_index)
+                result_scores.append(score)
     
     # スコア順にソート
-    results.sort(key=lambda x: x.similarity_score, reverse=True)
-    return results[:top_k]
+    return RankedResults(catalog, result_rows, result_scores).sorted_by_score()[:top_k]
+
+def canonicalize_query(query):
+    """検索キャッシュのキーとなる正規化済みクエリ（空白の統一・小文字化）"""
+    return " ".join(query.split()).lower()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_basic_search(canonical_query, top_k):
+    """基本検索の結果（行番号とスコア）をプロセス全体で共有キャッシュ"""
+    results = basic_search(canonical_query, top_k)
+    if not isinstance(results, RankedResults):
+        return [], []
+    return results.row_ids.tolist(), results.scores.tolist()
 
 def display_search_result(result, index: int):
     """検索結果を表示"""
@@ -662,9 +677,10 @@ def display_search_result(result, index: int):
         # st.write(f"DEBUG - result attributes: {dir(result)}")
         
         # メタデータから効果と有効成分を取得（英語キーで取得）
-        effect = result.metadata.get('effect', 'N/A') if hasattr(result, 'metadata') and result.metadata else 'N/A'
-        active_ingredient = result.metadata.get('ingredient', 'N/A') if hasattr(result, 'metadata') and result.metadata else 'N/A'
-        image_url = result.metadata.get('image_url', '') if hasattr(result, 'metadata') and result.metadata else ''
+        metadata = getattr(result, 'metadata', None) or {}
+        effect = metadata.get('effect', 'N/A')
+        active_ingredient = metadata.get('ingredient', 'N/A')
+        image_url = metadata.get('image_url', '')
         
         # レイアウト用の列を作成
         col1, col2 = st.columns([1, 3])
@@ -863,6 +879,19 @@ def main():
         key="search_input"
     )
     
+    # 入力補完の候補を表示
+    typeahead_index = load_typeahead_index()
+    if typeahead_index is not None and user_query and user_query.strip():
+        suggestions = [
+            term for term in typeahead_index.suggest(user_query.strip(), limit=5)
+            if term != user_query.strip()
+        ]
+        if suggestions:
+            suggestion_columns = st.columns(len(suggestions))
+            for column, term in zip(suggestion_columns, suggestions):
+                with column:
+                    st.button(term, key=f"suggestion_{term}", on_click=apply_suggestion, args=(term,), use_container_width=True)
+    
     # 検索ボタン（距離感を近く改善）
     col1, col2 = st.columns([2.5, 1.5])
     with col1:
@@ -871,7 +900,7 @@ def main():
     with col2:
         if st.button("🧹 画面クリア", help="検索結果と入力内容をクリア", use_container_width=True):
             # 検索結果関連のセッション状態をクリア
-            keys_to_clear = ['search_results', 'search_query', 'last_search', 'current_results', 'current_search_time', 'current_query', 'current_max_results']
+            keys_to_clear = ['search_results', 'search_query', 'last_search', 'current_cursor', 'current_search_time', 'current_query', 'current_max_results']
             for key in keys_to_clear:
                 if key in st.session_state:
                     del st.session_state[key]
@@ -889,34 +918,46 @@ def main():
     if search_button or (user_query and user_query.strip()):
         if user_query.strip():
             try:
-                # 一時的にRAGシステムを無効にして基本検索を使用
-                engine = None  # initialize_recommendation_engine()
+                query_key = (canonicalize_query(user_query), max_results)
+                previous_cursor = st.session_state.get('current_cursor')
                 
-                # エンジンが正常に初期化されたか確認
-                if engine is None:
-                    # AI機能が利用できない場合は静かに基本検索に切り替え
-                    with st.spinner("検索中..."):
-                        start_time = time.time()
-                        results = basic_search(user_query, max_results)  # max_resultsを正しく渡す
-                        search_time = time.time() - start_time
+                # クエリと最大結果数が前回と同じ再描画（エキスパンダー開閉・「もっと見る」など）では検索しない
+                if previous_cursor is not None and previous_cursor.query_key != query_key and previous_cursor.covers(query_key):
+                    # 最大結果数のスライダー操作だけなら前回の結果を切り詰めて再利用
+                    st.session_state['current_cursor'] = ResultCursor(
+                        query_key, previous_cursor.results[:max_results], page_size=RESULTS_PAGE_SIZE
+                    )
+                    st.session_state['current_max_results'] = max_results
+                elif previous_cursor is None or previous_cursor.query_key != query_key:
+                    # 一時的にRAGシステムを無効にして基本検索を使用
+                    engine = None  # initialize_recommendation_engine()
                     
-                    if not results:
-                        pass  # 検索直後の未ヒット時メッセージは非表示にする
+                    # エンジンが正常に初期化されたか確認
+                    if engine is None:
+                        # AI機能が利用できない場合は静かに基本検索に切り替え
+                        with st.spinner("検索中..."):
+                            start_time = time.time()
+                            row_ids, scores = cached_basic_search(*query_key)  # 同じクエリは全セッションで共有
+                            results = RankedResults(load_product_catalog() or ProductCatalog({}), row_ids, scores)
+                            search_time = time.time() - start_time
                         
-                else:
-                    with st.spinner("検索中..."):
-                        start_time = time.time()
-                        results = engine.search_products(
-                            user_query, 
-                            top_k=max_results
-                        )
-                        search_time = time.time() - start_time
-                
-                # 結果をセッションに保存（キャッシュを無効にして毎回新しく検索）
-                st.session_state['current_results'] = results
-                st.session_state['current_search_time'] = search_time
-                st.session_state['current_query'] = user_query
-                st.session_state['current_max_results'] = max_results  # 検索時のmax_resultsも保存
+                        if not results:
+                            pass  # 検索直後の未ヒット時メッセージは非表示にする
+                            
+                    else:
+                        with st.spinner("検索中..."):
+                            start_time = time.time()
+                            results = engine.search_ranked(
+                                query_key[0], 
+                                top_k=max_results
+                            )
+                            search_time = time.time() - start_time
+                    
+                    # 結果は行番号とスコアのカーソルとしてセッションに保存
+                    st.session_state['current_cursor'] = ResultCursor(query_key, results, page_size=RESULTS_PAGE_SIZE)
+                    st.session_state['current_search_time'] = search_time
+                    st.session_state['current_query'] = user_query
+                    st.session_state['current_max_results'] = max_results  # 検索時のmax_resultsも保存
                 
             except Exception as e:
                 st.markdown(f'<div style="color: #F44336; background-color: #FFEBEE; padding: 1rem; border-radius: 0.5rem; border-left: 4px solid #F44336;"><i class="fas fa-times-circle"></i> <strong>検索中にエラーが発生しました:</strong> {e}</div>', unsafe_allow_html=True)
@@ -925,22 +966,32 @@ def main():
             st.warning("検索クエリを入力してください。")
     
     # 検索結果の表示（セッションに保存された結果がある場合）
-    if 'current_results' in st.session_state:
-        results = st.session_state['current_results']
+    if 'current_cursor' in st.session_state:
+        cursor = st.session_state['current_cursor']
         search_time = st.session_state.get('current_search_time', 0)
         query = st.session_state.get('current_query', '')
 
         # 結果の表示
         st.markdown("---")
         st.markdown('### <i class="fas fa-list-ul"></i> 検索結果', unsafe_allow_html=True)
+        # 入力ミスを補正して検索した場合は補正後のクエリを表示
+        corrected_query = correct_query(cursor.query_key[0])
+        if corrected_query != cursor.query_key[0]:
+            st.caption(f"「{corrected_query}」の検索結果を表示しています")
         # 検索情報（結果数をコンパクトなバッジで表示）
-        st.markdown(f'<span class="result-count-badge">結果数: {len(results)}</span>', unsafe_allow_html=True)
+        st.markdown(f'<span class="result-count-badge">結果数: {cursor.total}</span>', unsafe_allow_html=True)
 
-        # 検索結果の表示
-        if results:
+        # 検索結果の表示（表示済みページ分のみカードを描画）
+        if cursor.total:
             st.markdown('### <i class="fas fa-pills"></i> おすすめ商品', unsafe_allow_html=True)
-            for i, result in enumerate(results):
+            for i, result in enumerate(cursor.visible_results()):
                 display_search_result(result, i)
+            if cursor.has_more:
+                st.button(
+                    f"もっと見る（残り{cursor.total - cursor.visible}件）",
+                    on_click=cursor.show_more,
+                    use_container_width=True
+                )
         else:
             st.warning("🤔 該当する商品が見つかりませんでした。別のキーワードで検索してみてください。")
     
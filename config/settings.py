@@ -34,7 +34,17 @@ class Settings:
         self.OKUSURI_COLUMN_URL = "https://okusuritsuhan.shop/column/"
         
         # スクレイピング設定
-        self.REQUEST_DELAY = 1.0  # リクエスト間隔（秒）
+        self.REQUEST_DELAY = 1.0  # 同一ホストへのリクエスト間隔（秒）
+        self.SCRAPER_CONCURRENCY = int(self._get_secret("SCRAPER_CONCURRENCY", "4"))  # 同時接続数（1で逐次取得）
+        self.HTTP_CACHE_PATH = "data/http_cache.db"  # 条件付きGET用のレスポンスキャッシュ
+        self.CRAWL_FRONTIER_PATH = "data/crawl_frontier.db"  # 中断したクロールの再開用
+        self.HTML_PARSER = self._get_secret("HTML_PARSER", "auto")  # auto / lxml / html.parser
+        self.SCRAPER_DISCOVERY = self._get_secret("SCRAPER_DISCOVERY", "auto")  # auto / sitemap / category
+        self.REQUEST_CONNECT_TIMEOUT = float(self._get_secret("REQUEST_CONNECT_TIMEOUT", "5"))  # 接続タイムアウト（秒）
+        self.REQUEST_READ_TIMEOUT = float(self._get_secret("REQUEST_READ_TIMEOUT", "20"))  # 読み込みタイムアウト（秒）
+        self.REQUEST_MAX_RETRIES = int(self._get_secret("REQUEST_MAX_RETRIES", "3"))  # 5xx/429・接続エラー時のリトライ回数
+        self.RETRY_BACKOFF_BASE = 0.5  # リトライ間隔の基準（秒、1回ごとに倍）
+        self.RETRY_BACKOFF_MAX = 30.0  # リトライ間隔の上限（秒、Retry-Afterもこの値で打ち切る）
         self.MAX_PAGES = 100  # 最大ページ数
         self.USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         
@@ -111,7 +111,8 @@ def run_data_collection():
     
     try:
         from src.scraper import OkusuriScraper
-        from src.data_exporter import ProductDataExporter
+        from src.data_exporter import ProductDataExporter, PYARROW_AVAILABLE
+        from src.change_feed import ChangeFeed, list_snapshots
         import json
         
         scraper = OkusuriScraper()
@@ -131,18 +132,33 @@ def run_data_collection():
             # データを正規化
             normalized = exporter.normalize_product_data(raw_data)
             
+            # 変更フィードの比較元（今回の保存前の最新スナップショット）
+            previous_snapshots = list_snapshots("data")
+            
             # タイムスタンプ付きファイル名で保存
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             
-            # 各種形式で保存
-            exporter.export_to_ndjson(normalized, f"products_{timestamp}.ndjson")
-            exporter.export_to_csv(normalized, f"products_{timestamp}.csv")
-            exporter.export_to_sqlite(normalized, f"products_{timestamp}.db")
-            
-            # メイン用ファイルも更新
-            exporter.export_to_ndjson(normalized, "products.ndjson")
+            # 各種形式とメイン用ファイルを1回の走査で保存
+            targets = [
+                ("ndjson", f"products_{timestamp}.ndjson"),
+                ("csv", f"products_{timestamp}.csv"),
+                ("sqlite", f"products_{timestamp}.db"),
+                ("ndjson", "products.ndjson"),
+            ]
+            if PYARROW_AVAILABLE:
+                # 分析・品質チェック用の列指向ファイル
+                targets.append(("arrow", "products.arrow"))
+            exporter.export_many(normalized, targets, parallel=True)
             
             print(f"✅ {len(normalized)} 件の商品データを収集・保存完了")
+            
+            if previous_snapshots:
+                feed = ChangeFeed(previous_snapshots[-1], Path(f"data/products_{timestamp}.ndjson"))
+                summary = feed.write_ndjson(Path(f"data/changes_{timestamp}.ndjson"))
+                print(
+                    f"🔄 前回からの変更: 追加 {summary.added} 件, 変更 {summary.changed} 件, "
+                    f"削除 {summary.removed} 件 (data/changes_{timestamp}.ndjson)"
+                )
             logger.info(f"商品データ収集完了: {len(normalized)} 件")
             
         else:
@@ -172,24 +188,28 @@ def run_data_processing():
         if choice == "1":
             print("\n📤 データエクスポート中...")
             
-            # NDJSONから読み込み
-            products = exporter.load_from_ndjson("products.ndjson")
-            if not products:
+            if not (exporter.data_dir / "products.ndjson").exists():
                 print("❌ 処理するデータがありません")
                 return
             
-            # 各種形式でエクスポート
+            # NDJSONを1件ずつ読みながら各種形式へ同時にエクスポート
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            exporter.export_to_json(products, f"export_{timestamp}.json")
-            exporter.export_to_csv(products, f"export_{timestamp}.csv") 
-            exporter.export_to_sqlite(products, f"export_{timestamp}.db")
+            result = exporter.export_many(exporter.iter_ndjson("products.ndjson"), [
+                ("json", f"export_{timestamp}.json"),
+                ("csv", f"export_{timestamp}.csv"),
+                ("sqlite", f"export_{timestamp}.db"),
+            ], parallel=True)
             
-            print(f"✅ {len(products)} 件のデータをエクスポート完了")
+            print(f"✅ {result.count} 件のデータをエクスポート完了")
             
         elif choice == "2":
             print("\n🔧 FAISSインデックス再構築中...")
             
-            products = exporter.load_from_ndjson("products.ndjson")
+            # FAISSに必要なフィールドだけを読み込む
+            products = exporter.load_from_ndjson(
+                "products.ndjson",
+                fields=('id', 'name', 'description', 'category', 'url', 'tags')
+            )
             if not products:
                 print("❌ 処理するデータがありません")
                 return
@@ -200,13 +220,13 @@ def run_data_processing():
             products_data = []
             for product in products:
                 product_dict = {
-                    'id': product.id,
-                    'name': product.name,
-                    'description': product.description or '',
-                    'category': product.category,
-                    'url': product.url,
-                    'tags': product.tags or [],
-                    'text': f"{product.name} {product.description or ''} {' '.join(product.tags or [])}"
+                    'id': product['id'],
+                    'name': product['name'],
+                    'description': product['description'] or '',
+                    'category': product['category'],
+                    'url': product['url'],
+                    'tags': product['tags'] or [],
+                    'text': f"{product['name']} {product['description'] or ''} {' '.join(product['tags'] or [])}"
                 }
                 products_data.append(product_dict)
             
@@ -215,33 +235,20 @@ def run_data_processing():
             
         elif choice == "3":
             print("\n🔍 データ品質チェック中...")
-            products = exporter.load_from_ndjson("products.ndjson")
+            stats = exporter.catalog_stats("products.ndjson", missing_category='unknown')
             
-            if products:
-                print(f"📊 総商品数: {len(products)}")
-                categories = {}
-                missing_fields = {'price': 0, 'description': 0, 'image_url': 0}
-                
-                for product in products:
-                    # カテゴリー統計
-                    cat = product.category or 'unknown'
-                    categories[cat] = categories.get(cat, 0) + 1
-                    
-                    # 欠損フィールド統計
-                    if not product.price:
-                        missing_fields['price'] += 1
-                    if not product.description:
-                        missing_fields['description'] += 1
-                    if not product.image_url:
-                        missing_fields['image_url'] += 1
+            if stats:
+                total = stats['total']
+                print(f"📊 総商品数: {total}")
                 
                 print("\n📋 カテゴリー別商品数:")
-                for cat, count in categories.items():
+                for cat, count in stats['categories'].items():
                     print(f"  {cat}: {count} 件")
                 
                 print("\n⚠️ 欠損フィールド統計:")
-                for field, count in missing_fields.items():
-                    print(f"  {field}: {count} 件 ({count/len(products)*100:.1f}%)")
+                for field, present in stats['present'].items():
+                    count = total - present
+                    print(f"  {field}: {count} 件 ({count/total*100:.1f}%)")
             else:
                 print("❌ 処理するデータがありません")
                 
@@ -301,49 +308,40 @@ def run_data_analysis():
         import json
         
         exporter = ProductDataExporter()
-        products = exporter.load_from_ndjson("products.ndjson")
+        # 列指向ファイル（products.arrow）があれば列単位で集計
+        stats = exporter.catalog_stats("products.ndjson")
         
-        if not products:
+        if not stats:
             print("❌ 分析するデータがありません")
             return
         
-        print(f"\n📊 基本統計")
-        print(f"総商品数: {len(products)}")
-        print(f"データソース: {products[0].source if products else 'N/A'}")
-        
-        # カテゴリー分析
-        categories = {}
-        tag_counts = {}
+        total = stats['total']
+        categories = stats['categories']
         
-        for product in products:
-            # カテゴリー統計
-            cat = product.category or 'その他'
-            categories[cat] = categories.get(cat, 0) + 1
-            
-            # タグ統計
-            for tag in product.tags or []:
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        print(f"\n📊 基本統計")
+        print(f"総商品数: {total}")
+        print(f"データソース: {stats['source'] or 'N/A'}")
         
         print(f"\n🏷️ カテゴリー別商品数:")
         for cat, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
-            percentage = count / len(products) * 100
+            percentage = count / total * 100
             print(f"  {cat}: {count} 件 ({percentage:.1f}%)")
         
         print(f"\n🔖 人気タグ TOP5:")
-        sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        sorted_tags = sorted(stats['tag_counts'].items(), key=lambda x: x[1], reverse=True)[:5]
         for tag, count in sorted_tags:
             print(f"  {tag}: {count} 件")
         
         # レポート保存
         report = {
             'timestamp': datetime.now().isoformat(),
-            'total_products': len(products),
+            'total_products': total,
             'categories': categories,
             'top_tags': dict(sorted_tags),
             'data_quality': {
-                'with_price': len([p for p in products if p.price]),
-                'with_description': len([p for p in products if p.description]),
-                'with_image': len([p for p in products if p.image_url])
+                'with_price': stats['present']['price'],
+                'with_description': stats['present']['description'],
+                'with_image': stats['present']['image_url']
             }
         }
         
@@ -416,7 +414,7 @@ def run_cli_recommendation():
                 break
             
             print(f"\n検索中: '{query}'")
-            results = rag.search_products(query, top_k=5)
+            results = rag.search_unique_products(query, top_k=5)
             
             if results:
                 print(f"\n📋 検索結果 ({len(results)} 件):")
@@ -486,8 +484,8 @@ def check_system_status():
         
         # データファイル確認
         exporter = ProductDataExporter()
-        products = exporter.load_from_ndjson("products.ndjson")
-        print(f"📊 商品データ: {len(products) if products else 0} 件")
+        product_count = exporter.count_ndjson('products.ndjson')
+        print(f"📊 商品データ: {product_count} 件")
         
         # FAISSインデックス確認
         try:
@@ -515,7 +513,7 @@ def check_system_status():
         print("\n=== 動作テスト ===")
         
         # 簡単な検索テスト
-        if products:
+        if product_count:
             try:
                 rag = FAISSRAGSystem()
                 test_results = rag.search_products("治療", top_k=1)
@@ -529,11 +527,11 @@ def check_system_status():
             print("⚠️ 検索機能: データなし")
         
         print("\n=== 推奨アクション ===")
-        if not products:
+        if not product_count:
             print("1. まず「商品データ収集」を実行してください")
         if not settings.OPENAI_API_KEY:
             print("2. .envファイルにOPENAI_API_KEYを設定してください")
-        if products and len(products) < 10:
+        if product_count and product_count < 10:
             print("3. より多くの商品データを収集することを推奨します")
         
     except Exception as e:
@@ -0,0 +1,154 @@
+"""
+商品スナップショット間の変更フィード
+2つのNDJSONスナップショット（products_{timestamp}.ndjson）を比較し、
+追加・変更・削除された商品IDを順に返す（後段の処理は差分だけを扱えばよい）
+"""
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# 取得のたびに変わる、または比較に使わないフィールド
+VOLATILE_FIELDS = ('scraped_at', 'raw_data')
+
+CHANGE_ADDED = 'added'
+CHANGE_CHANGED = 'changed'
+CHANGE_REMOVED = 'removed'
+
+# キーの順序と空白を固定した正規化用エンコーダー
+_CANONICAL_ENCODER = json.JSONEncoder(ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+@dataclass
+class ChangeEvent:
+    """変更フィードの1件（removedのrecordはNone）"""
+    kind: str
+    id: str
+    record: Optional[Dict[str, Any]] = None
+
+@dataclass
+class ChangeSummary:
+    """変更フィードの件数"""
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    duplicates: int = 0  # 新しいスナップショット内で重複していたID（最初の行だけを比較）
+
+    @property
+    def total_changes(self) -> int:
+        return self.added + self.changed + self.removed
+
+def record_fingerprint(record: Dict[str, Any]) -> bytes:
+    """VOLATILE_FIELDSを除いて正規化した商品レコードのハッシュ"""
+    normalized = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    return hashlib.blake2b(_CANONICAL_ENCODER.encode(normalized).encode('utf-8'), digest_size=16).digest()
+
+def iter_snapshot(path: Path) -> Iterator[Dict[str, Any]]:
+    """NDJSONスナップショットの商品レコードを1件ずつ返す"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def snapshot_fingerprints(path: Path) -> Dict[str, bytes]:
+    """スナップショットの 商品ID→ハッシュ（同じIDが複数ある場合は後の行）"""
+    return {record['id']: record_fingerprint(record) for record in iter_snapshot(path)}
+
+class ChangeFeed:
+    """2つのスナップショットの差分を ChangeEvent として順に返す
+
+    古いスナップショットはIDとハッシュだけを保持し、新しいスナップショットは
+    1行ずつ読みながら added / changed を返す。最後に古い側にしかないIDを removed として返す。
+    走査後の件数は summary に入る。
+    """
+
+    def __init__(self, old_path: Path, new_path: Path):
+        self.old_path = Path(old_path)
+        self.new_path = Path(new_path)
+        self.summary = ChangeSummary()
+
+    def __iter__(self) -> Iterator[ChangeEvent]:
+        summary = self.summary = ChangeSummary()
+        old = snapshot_fingerprints(self.old_path) if self.old_path.exists() else {}
+        seen: Set[str] = set()
+
+        for record in iter_snapshot(self.new_path):
+            product_id = record['id']
+            if product_id in seen:
+                summary.duplicates += 1
+                continue
+            seen.add(product_id)
+            old_fingerprint = old.pop(product_id, None)
+            if old_fingerprint is None:
+                summary.added += 1
+                yield ChangeEvent(CHANGE_ADDED, product_id, record)
+            elif old_fingerprint != record_fingerprint(record):
+                summary.changed += 1
+                yield ChangeEvent(CHANGE_CHANGED, product_id, record)
+            else:
+                summary.unchanged += 1
+
+        for product_id in old:
+            summary.removed += 1
+            yield ChangeEvent(CHANGE_REMOVED, product_id)
+
+    def write_ndjson(self, path: Path, include_records: bool = True) -> ChangeSummary:
+        """変更をNDJSON（1行1件: kind, id, record）で書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for event in self:
+                line = {'kind': event.kind, 'id': event.id}
+                if include_records and event.record is not None:
+                    line['record'] = event.record
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        return self.summary
+
+def list_snapshots(data_dir: str = "data", pattern: str = "products_*.ndjson") -> List[Path]:
+    """タイムスタンプ付きスナップショットを古い順に返す（ファイル名のタイムスタンプ順）"""
+    return sorted(Path(data_dir).glob(pattern))
+
+def latest_change_feed(data_dir: str = "data") -> Optional[ChangeFeed]:
+    """最新の2つのスナップショットの変更フィード（2つ未満ならNone）"""
+    snapshots = list_snapshots(data_dir)
+    if len(snapshots) < 2:
+        return None
+    return ChangeFeed(snapshots[-2], snapshots[-1])
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="商品スナップショット間の変更フィード")
+    parser.add_argument("old", nargs="?", help="比較元のNDJSON（省略時は最新の2つを比較）")
+    parser.add_argument("new", nargs="?", help="比較先のNDJSON")
+    parser.add_argument("--data-dir", default="data", help="スナップショットのディレクトリ")
+    parser.add_argument("--output", help="変更をNDJSONで書き出すファイル")
+    parser.add_argument("--ids-only", action="store_true", help="書き出す変更に商品レコードを含めない")
+    args = parser.parse_args()
+
+    if args.old and args.new:
+        feed = ChangeFeed(Path(args.old), Path(args.new))
+    else:
+        feed = latest_change_feed(args.data_dir)
+        if feed is None:
+            print(f"❌ 比較するスナップショットが2つ以上ありません: {args.data_dir}")
+            return
+
+    print(f"🔄 {feed.old_path.name} → {feed.new_path.name}")
+    if args.output:
+        summary = feed.write_ndjson(Path(args.output), include_records=not args.ids_only)
+        print(f"💾 変更を書き出し: {args.output}")
+    else:
+        for event in feed:
+            print(f"  {event.kind:<8} {event.id}")
+        summary = feed.summary
+
+    print(
+        f"📊 追加 {summary.added} 件, 変更 {summary.changed} 件, 削除 {summary.removed} 件, "
+        f"変更なし {summary.unchanged} 件"
+    )
+    if summary.duplicates:
+        print(f"⚠️ 重複ID {summary.duplicates} 件を比較から除外しました")
+
+if __name__ == "__main__":
+    main()
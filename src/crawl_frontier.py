@@ -0,0 +1,160 @@
+"""
+再開可能なクロールフロンティア
+取得対象URLの重複判定・取得状態・リトライ回数をSQLiteに保存し、中断したクロールを途中から再開する
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+class CrawlFrontier:
+    """SQLiteに保存するクロール対象URLの待ち行列（スレッドセーフ）"""
+
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # クロール全体の進行状態（中断したクロールだけを再開するため）
+    CRAWL_STATUS_KEY = 'crawl_status'
+    CRAWL_IN_PROGRESS = 'in_progress'
+    CRAWL_COMPLETE = 'complete'
+
+    def __init__(self, db_path: str = "data/crawl_frontier.db", max_retries: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript('''
+        CREATE TABLE IF NOT EXISTS frontier (
+            url TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            retries INTEGER NOT NULL DEFAULT 0,
+            discovered_at TEXT,
+            updated_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_frontier_kind_status ON frontier (kind, status);
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        ''')
+        self.conn.commit()
+
+    def add(self, urls: Iterable[str], kind: str = 'product') -> int:
+        """未登録のURLだけを追加し、追加件数を返す（登録済みURLは主キーで無視）"""
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO frontier (url, kind, discovered_at, updated_at) VALUES (?, ?, ?, ?)',
+                ((url, kind, now, now) for url in urls)
+            )
+            self.conn.commit()
+            return self.conn.total_changes - before
+
+    def pending(self, kind: str = 'product', limit: Optional[int] = None) -> List[str]:
+        """未取得のURLを登録順に返す"""
+        query = 'SELECT url FROM frontier WHERE kind = ? AND status = ? ORDER BY rowid'
+        params = [kind, self.PENDING]
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self.conn.execute(query, params)]
+
+    def mark_done(self, url: str):
+        """取得完了にする"""
+        with self._lock:
+            self.conn.execute(
+                'UPDATE frontier SET status = ?, updated_at = ? WHERE url = ?',
+                (self.DONE, datetime.utcnow().isoformat(), url)
+            )
+            self.conn.commit()
+
+    def mark_failed(self, url: str):
+        """失敗を記録（リトライ上限に達するまでは未取得のまま残す）"""
+        with self._lock:
+            self.conn.execute(
+                '''
+                UPDATE frontier
+                SET retries = retries + 1,
+                    status = CASE WHEN retries + 1 >= ? THEN ? ELSE ? END,
+                    updated_at = ?
+                WHERE url = ?
+                ''',
+                (self.max_retries, self.FAILED, self.PENDING, datetime.utcnow().isoformat(), url)
+            )
+            self.conn.commit()
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, int]:
+        """状態ごとのURL数"""
+        query = 'SELECT status, COUNT(*) FROM frontier'
+        params = []
+        if kind is not None:
+            query += ' WHERE kind = ?'
+            params.append(kind)
+        query += ' GROUP BY status'
+        with self._lock:
+            return dict(self.conn.execute(query, params).fetchall())
+
+    def has_pending(self, kind: str = 'product') -> bool:
+        return self.counts(kind).get(self.PENDING, 0) > 0
+
+    def start_crawl(self, urls: Iterable[str], kind: str = 'product') -> int:
+        """新しいクロールを開始し、取得対象のURL数を返す
+
+        取得済みのURLは消去し、前回の未取得・失敗URLは未取得に戻して引き継ぐ
+        （リトライ回数は維持するため、上限に達したURLは1回だけ再試行される）。
+        """
+        now = datetime.utcnow().isoformat()
+        with self._lock:
+            self.conn.execute('DELETE FROM frontier WHERE kind = ? AND status = ?', (kind, self.DONE))
+            self.conn.execute(
+                'UPDATE frontier SET status = ?, updated_at = ? WHERE kind = ? AND status = ?',
+                (self.PENDING, now, kind, self.FAILED)
+            )
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO frontier (url, kind, discovered_at, updated_at) VALUES (?, ?, ?, ?)',
+                ((url, kind, now, now) for url in urls)
+            )
+            self.conn.execute(
+                'INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)',
+                (self.CRAWL_STATUS_KEY, self.CRAWL_IN_PROGRESS)
+            )
+            self.conn.commit()
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM frontier WHERE kind = ? AND status = ?', (kind, self.PENDING)
+            ).fetchone()[0]
+
+    def crawl_in_progress(self) -> bool:
+        """前回のクロールが完了せずに中断されたか"""
+        return self.get_state(self.CRAWL_STATUS_KEY) == self.CRAWL_IN_PROGRESS
+
+    def finish_crawl(self):
+        """クロール完了を記録（残った失敗URLは次のstart_crawlで引き継ぐ）"""
+        self.set_state(self.CRAWL_STATUS_KEY, self.CRAWL_COMPLETE)
+
+    def reset(self):
+        """新しいクロールを始めるために登録済みURLを消去"""
+        with self._lock:
+            self.conn.execute('DELETE FROM frontier')
+            self.conn.commit()
+
+    def get_state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """クロール全体の状態値を取得"""
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM crawl_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key: str, value: str):
+        """クロール全体の状態値を保存"""
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)', (key, value))
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -4,17 +4,122 @@
 """
 import json
 import csv
+import os
+import re
 import sqlite3
+import struct
 import hashlib
+import mmap
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from itertools import chain, islice
+from typing import List, Dict, Any, Deque, Iterable, Iterator, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, fields
 from pathlib import Path
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# SQLiteのproductsテーブルに書き込む列（created_atは既定値）
+SQLITE_COLUMNS = (
+    'id', 'name', 'url', 'category', 'category_url', 'price', 'description', 'short_description',
+    'image_url', 'ingredients', 'dosage', 'manufacturer', 'stock_status', 'tags',
+    'scraped_at', 'source', 'raw_data'
+)
+
+SQLITE_CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    url TEXT,
+    category TEXT,
+    category_url TEXT,
+    price TEXT,
+    description TEXT,
+    short_description TEXT,
+    image_url TEXT,
+    ingredients TEXT,
+    dosage TEXT,
+    manufacturer TEXT,
+    stock_status TEXT,
+    tags TEXT,  -- JSON配列として保存
+    scraped_at TEXT,
+    source TEXT,
+    raw_data TEXT,  -- JSON文字列として保存
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# 読み込み完了後に作成する副次インデックス（名前, 作成SQL）
+SQLITE_INDEXES = (
+    ('idx_products_category', 'CREATE INDEX IF NOT EXISTS idx_products_category ON products (category)'),
+    ('idx_products_url', 'CREATE INDEX IF NOT EXISTS idx_products_url ON products (url)'),
+)
+
+# 一括読み込み時のPRAGMA（WALではsynchronous=NORMALでもコミット済みデータは失われない）
+SQLITE_BULK_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',  # 64MB
+    'PRAGMA temp_store=MEMORY',
+)
+
+# 1トランザクションで書き込む行数
+SQLITE_BATCH_SIZE = 5000
+
+# 全文検索用のFTS5テーブル（productsを外部コンテンツとして参照し、エクスポートのたびに再構築）
+SQLITE_FTS_TABLE = 'products_fts'
+SQLITE_FTS_COLUMNS = ('name', 'description', 'ingredients', 'tags')
+# 日本語は単語区切りがないためtrigramを優先（SQLite 3.34未満ではunicode61）
+SQLITE_FTS_TOKENIZERS = ('trigram', 'unicode61')
+
+# 商品URL中の商品番号（okusuritsuhan.shopの /merchandise/{番号}）
+MERCHANDISE_URL_PATTERN = re.compile(r'/merchandise/(\d+)')
+
+# 商品番号がない場合に複合キーとして使う生データのフィールド
+# （スクレイパーの英語キーと、product_recommend.csvの日本語列のうち最初に値があるもの）
+PRODUCT_ID_FALLBACK_FIELDS = (
+    ('name', '商品名'),
+    ('category_url', 'サブカテゴリURL', 'カテゴリURL'),
+    ('url', '商品URL'),
+    ('image_url', '商品画像URL'),
+    ('description', '説明文'),
+)
+
+def _first_value(raw: Dict[str, Any], names: Tuple[str, ...]) -> str:
+    for name in names:
+        value = raw.get(name)
+        if value:
+            return str(value)
+    return ''
+
+def stable_product_id(raw: Dict[str, Any]) -> str:
+    """生データから衝突しない商品IDを作る
+    
+    商品URL（url または 商品URL）に商品番号があれば「m{番号}」。
+    なければ（javascript:void(0) のカテゴリー項目など）複数フィールドを連結した複合キーの
+    ハッシュで「h{16桁}」とする（URLだけでは同じIDになる項目も区別できる）。
+    """
+    url = raw.get('url') or raw.get('商品URL') or ''
+    match = MERCHANDISE_URL_PATTERN.search(url)
+    if match:
+        return f"m{match.group(1)}"
+    key = '\x1f'.join(_first_value(raw, names) for names in PRODUCT_ID_FALLBACK_FIELDS)
+    return 'h' + hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
 @dataclass
 class ProductSchema:
     """商品データの標準スキーマ"""
-    id: str                    # 一意識別子（URL or ハッシュベース）
+    id: str                    # 一意識別子（商品番号 or 複合キーのハッシュ、stable_product_id）
     name: str                  # 商品名
     url: str                   # 商品詳細URL
     category: str              # カテゴリー（ED治療薬、AGA治療薬など）
@@ -38,188 +143,938 @@ class ProductSchema:
         if self.scraped_at is None:
             self.scraped_at = datetime.utcnow().isoformat()
 
+# タグとして抽出するキーワード
+TAG_KEYWORDS = ('治療', '効果', '成分', '服用', '症状')
+
+# この件数以上の生データは複数プロセスで正規化する
+NORMALIZE_PARALLEL_MIN_RECORDS = 20000
+# 1プロセスに渡す生データの件数
+NORMALIZE_CHUNK_SIZE = 2000
+
+def normalize_product(raw: Dict[str, Any]) -> ProductSchema:
+    """生データ1件を標準スキーマに変換"""
+    # IDの生成（商品番号、なければ複合キーのハッシュ）
+    product_id = stable_product_id(raw)
+    
+    # カテゴリー名の抽出
+    category = raw.get('name', '').replace('治療薬', '').replace('薬', '').strip()
+    
+    # 説明文のクリーニング（改行と余分な空白を整理）
+    description = raw.get('description', '')
+    if description:
+        description = ' '.join(description.split())
+    
+    # タグの生成（カテゴリーと説明から、重複除去して出現順を保つ）
+    tags = [category]
+    if description:
+        # 5語程度ではstrの部分一致の方が正規表現の選択より速い
+        tags.extend(keyword for keyword in TAG_KEYWORDS if keyword in description)
+    
+    return ProductSchema(
+        id=product_id,
+        name=raw.get('name', ''),
+        url=raw.get('url', ''),
+        category=category,
+        category_url=raw.get('category_url', ''),
+        description=description,
+        short_description=description[:100] if description else None,  # 最初の100文字
+        image_url=raw.get('image_url'),
+        tags=list(dict.fromkeys(tags)),
+        raw_data=raw
+    )
+
+def _normalize_chunk(raw_products: List[Dict[str, Any]]) -> List[ProductSchema]:
+    """生データのチャンクを正規化（プロセスプールのワーカーで実行）"""
+    return [normalize_product(raw) for raw in raw_products]
+
+# json.dumpsはensure_ascii=Falseなどの指定があると呼び出しごとにエンコーダーを作るため共有する
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_JSON_INDENT_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+# ProductSchemaのフィールド名（出力列の順）
+PRODUCT_FIELDS = tuple(f.name for f in fields(ProductSchema))
+
+def product_record(product: ProductSchema) -> Dict[str, Any]:
+    """商品を出力用の辞書に変換（asdictと異なりtags・raw_dataを複製しない）"""
+    return {name: getattr(product, name) for name in PRODUCT_FIELDS}
+
+def product_csv_row(record: Dict[str, Any]) -> Dict[str, Any]:
+    """出力用の辞書をCSVの1行に変換（リストや辞書はJSON文字列化）"""
+    return {
+        key: _JSON_ENCODER.encode(value) if isinstance(value, (list, dict)) else value
+        for key, value in record.items()
+    }
+
+def prepare_record(product: ProductSchema) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """商品を (出力用の辞書, 入れ子をJSON文字列化した辞書) に1回だけ変換（全シンクで共有）"""
+    record = product_record(product)
+    return record, product_csv_row(record)
+
+def product_sqlite_row(record: Dict[str, Any], flat: Dict[str, Any]) -> tuple:
+    """productsテーブルの1行（SQLITE_COLUMNSの順）に変換（JSONフィールドはflatの文字列を使う）"""
+    return (
+        record['id'], record['name'], record['url'], record['category'],
+        record['category_url'], record['price'], record['description'],
+        record['short_description'], record['image_url'], record['ingredients'],
+        record['dosage'], record['manufacturer'], record['stock_status'],
+        flat['tags'],
+        record['scraped_at'], record['source'],
+        flat['raw_data'] if record['raw_data'] else None
+    )
+
+class JSONExportSink:
+    """JSON配列として1件ずつ書き込むシンク（json.dump(indent=2)と同じ内容になる）"""
+    
+    FORMAT_LABEL = 'JSON'
+    
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self.count = 0
+        self._file = open(filepath, 'w', encoding='utf-8')
+        self._file.write('[')
+    
+    def write(self, record: Dict[str, Any], flat: Dict[str, Any]):
+        text = _JSON_INDENT_ENCODER.encode(record)
+        # 配列の要素として1段深くインデント（文字列中の改行はエスケープ済み）
+        self._file.write((',\n  ' if self.count else '\n  ') + text.replace('\n', '\n  '))
+        self.count += 1
+    
+    def close(self):
+        self._file.write('\n]' if self.count else ']')
+        self._file.close()
+
+class NDJSONExportSink:
+    """1件1行のNDJSONとして書き込むシンク"""
+    
+    FORMAT_LABEL = 'NDJSON'
+    
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self.count = 0
+        self._file = open(filepath, 'w', encoding='utf-8')
+    
+    def write(self, record: Dict[str, Any], flat: Dict[str, Any]):
+        self._file.write(_JSON_ENCODER.encode(record) + '\n')
+        self.count += 1
+    
+    def close(self):
+        self._file.close()
+
+class CSVExportSink:
+    """CSVとして書き込むシンク（ネストフィールドはJSON文字列化）"""
+    
+    FORMAT_LABEL = 'CSV'
+    
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self.count = 0
+        self._file = open(filepath, 'w', encoding='utf-8', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=PRODUCT_FIELDS)
+        self._writer.writeheader()
+    
+    def write(self, record: Dict[str, Any], flat: Dict[str, Any]):
+        self._writer.writerow(flat)
+        self.count += 1
+    
+    def close(self):
+        self._file.close()
+
+class SQLiteExportSink:
+    """SQLiteに一括読み込みするシンク（WAL・executemanyによるバッチ単位の書き込み）
+
+    副次インデックスは読み込み前に削除し、close()で全行の書き込み後にまとめて作成する。
+    全文検索テーブル（products_fts）もclose()で再構築して内容を一致させる。
+    """
+    
+    FORMAT_LABEL = 'SQLite'
+    
+    def __init__(self, filepath: Path, batch_size: int = SQLITE_BATCH_SIZE):
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.count = 0
+        self.fts_tokenizer: Optional[str] = None
+        self._batch: List[tuple] = []
+        # INSERT OR REPLACEは既存行を削除して入れ直す（rowid・created_atが変わる）ため、
+        # 同じIDは行を残したまま列だけを更新する
+        self._insert_sql = (
+            f'INSERT INTO products ({", ".join(SQLITE_COLUMNS)}) '
+            f'VALUES ({", ".join("?" * len(SQLITE_COLUMNS))}) '
+            f'ON CONFLICT(id) DO UPDATE SET '
+            + ', '.join(f'{column} = excluded.{column}' for column in SQLITE_COLUMNS if column != 'id')
+        )
+        # 並列出力では書き込みスレッドから使うため、作成スレッド以外からの利用を許可
+        self.conn = sqlite3.connect(filepath, isolation_level=None, check_same_thread=False)
+        for pragma in SQLITE_BULK_PRAGMAS:
+            self.conn.execute(pragma)
+        self.conn.execute(SQLITE_CREATE_TABLE)
+        for index_name, _ in SQLITE_INDEXES:
+            self.conn.execute(f'DROP INDEX IF EXISTS {index_name}')
+    
+    def write(self, record: Dict[str, Any], flat: Dict[str, Any]):
+        self._batch.append(product_sqlite_row(record, flat))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self):
+        if not self._batch:
+            return
+        self.conn.execute('BEGIN')
+        self.conn.executemany(self._insert_sql, self._batch)
+        self.conn.execute('COMMIT')
+        self.count += len(self._batch)
+        self._batch = []
+    
+    def close(self):
+        try:
+            self._flush()
+            self.conn.execute('BEGIN')
+            for _, create_sql in SQLITE_INDEXES:
+                self.conn.execute(create_sql)
+            self.conn.execute('COMMIT')
+            self.fts_tokenizer = _rebuild_fts(self.conn)
+            self.conn.execute('PRAGMA optimize')
+        finally:
+            self.conn.close()
+
+def _rebuild_fts(conn: sqlite3.Connection) -> Optional[str]:
+    """productsの全文検索インデックスを再構築し、使用したトークナイザー名を返す（FTS5非対応ならNone）"""
+    columns = ", ".join(SQLITE_FTS_COLUMNS)
+    for tokenizer in SQLITE_FTS_TOKENIZERS:
+        try:
+            conn.execute(f'DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}')
+            conn.execute(
+                f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5("
+                f"{columns}, content='products', content_rowid='rowid', tokenize='{tokenizer}')"
+            )
+        except sqlite3.OperationalError:
+            continue
+        conn.execute('BEGIN')
+        conn.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES('rebuild')")
+        conn.execute('COMMIT')
+        return tokenizer
+    return None
+
+# 列指向出力で1レコードバッチにまとめる行数
+ARROW_BATCH_SIZE = 10000
+
+# 値の種類が少ない列は辞書エンコードする
+ARROW_DICTIONARY_FIELDS = ('category', 'category_url', 'manufacturer', 'stock_status', 'source')
+
+def arrow_schema():
+    """列指向出力のスキーマ（tagsは辞書エンコードした文字列のリスト、raw_dataはJSON文字列）"""
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        (name, dictionary if name in ARROW_DICTIONARY_FIELDS
+         else pa.list_(dictionary) if name == 'tags'
+         else pa.string())
+        for name in PRODUCT_FIELDS
+    ])
+
+class _ArrowBatchSink:
+    """レコードをARROW_BATCH_SIZE行ずつRecordBatchにして書き込むシンクの共通処理"""
+    
+    def __init__(self, filepath: Path, batch_size: int = ARROW_BATCH_SIZE):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("列指向形式の出力にはpyarrowが必要です（pip install pyarrow）")
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.count = 0
+        self.schema = arrow_schema()
+        self._columns: Dict[str, List] = {name: [] for name in PRODUCT_FIELDS}
+        self._writer = self._open_writer()
+    
+    def _open_writer(self):
+        raise NotImplementedError
+    
+    def write(self, record: Dict[str, Any], flat: Dict[str, Any]):
+        for name, column in self._columns.items():
+            column.append(record[name])
+        # raw_dataはSQLiteと同じくJSON文字列（空ならNone）
+        self._columns['raw_data'][-1] = flat['raw_data'] if record['raw_data'] else None
+        if len(self._columns['id']) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self):
+        size = len(self._columns['id'])
+        if not size:
+            return
+        arrays = [pa.array(self._columns[field.name], type=field.type) for field in self.schema]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.count += size
+        self._columns = {name: [] for name in PRODUCT_FIELDS}
+    
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+class ParquetExportSink(_ArrowBatchSink):
+    """Parquetとして書き込むシンク（圧縮あり・他ツールとの受け渡し用）"""
+    
+    FORMAT_LABEL = 'Parquet'
+    
+    def _open_writer(self):
+        return pq.ParquetWriter(self.filepath, self.schema, compression='zstd')
+
+class ArrowExportSink(_ArrowBatchSink):
+    """Arrow IPCストリームとして書き込むシンク（非圧縮・メモリマップでゼロコピー読み込み用）"""
+    
+    FORMAT_LABEL = 'Arrow'
+    
+    def _open_writer(self):
+        self._file = pa.OSFile(str(self.filepath), 'wb')
+        return pa.ipc.new_stream(
+            self._file, self.schema,
+            options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        )
+    
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._file.close()
+
+# export_manyで指定できる出力形式
+EXPORT_SINKS = {
+    'json': JSONExportSink,
+    'ndjson': NDJSONExportSink,
+    'csv': CSVExportSink,
+    'sqlite': SQLiteExportSink,
+    'parquet': ParquetExportSink,
+    'arrow': ArrowExportSink,
+}
+
+# 並列出力でシンクごとの待ち行列に渡す件数と、待ち行列に溜められるチャンク数
+FANOUT_CHUNK_SIZE = 256
+FANOUT_QUEUE_CHUNKS = 16
+
+# catalog_statsで集計する列（入力件数を数える項目はCATALOG_PRESENCE_FIELDS）
+CATALOG_PRESENCE_FIELDS = ('price', 'description', 'image_url')
+CATALOG_STATS_COLUMNS = ('source', 'category', 'tags') + CATALOG_PRESENCE_FIELDS
+
+def summarize_products(products: Iterable[ProductSchema], missing_category: str = 'その他') -> Optional[Dict[str, Any]]:
+    """商品を1件ずつ走査して基本統計を集計（列指向ファイルがない場合の集計）"""
+    total = 0
+    source = None
+    categories: Dict[str, int] = {}
+    tag_counts: Dict[str, int] = {}
+    present = {name: 0 for name in CATALOG_PRESENCE_FIELDS}
+    for product in products:
+        if source is None:
+            source = product.source
+        total += 1
+        category = product.category or missing_category
+        categories[category] = categories.get(category, 0) + 1
+        for tag in product.tags or []:
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        for name in CATALOG_PRESENCE_FIELDS:
+            if getattr(product, name):
+                present[name] += 1
+    if not total:
+        return None
+    return {'total': total, 'source': source, 'categories': categories, 'tag_counts': tag_counts, 'present': present}
+
+def _value_counts(column) -> Dict[Any, int]:
+    """列（辞書エンコード列を含む）の値ごとの件数（Noneを含む）"""
+    counts: Dict[Any, int] = {}
+    for item in pc.value_counts(column).to_pylist():
+        counts[item['values']] = counts.get(item['values'], 0) + item['counts']
+    return counts
+
+def summarize_columns(table, missing_category: str = 'その他') -> Optional[Dict[str, Any]]:
+    """pyarrow.Tableの列をそのまま集計して基本統計を返す（summarize_productsと同じ結果）"""
+    total = table.num_rows
+    if not total:
+        return None
+    categories: Dict[str, int] = {}
+    for category, count in _value_counts(table['category']).items():
+        key = category or missing_category
+        categories[key] = categories.get(key, 0) + count
+    tag_counts = {
+        tag: count
+        for tag, count in _value_counts(pc.list_flatten(table['tags'])).items()
+        if tag is not None
+    }
+    present = {
+        # 空文字とNoneを未入力として数えない（列単位で長さを判定）
+        name: pc.sum(pc.greater(pc.utf8_length(table[name]), 0)).as_py() or 0
+        for name in CATALOG_PRESENCE_FIELDS
+    }
+    return {
+        'total': total,
+        'source': table['source'][0].as_py(),
+        'categories': categories,
+        'tag_counts': tag_counts,
+        'present': present,
+    }
+
+# この大きさ以上のNDJSONは複数プロセスで分割して解析する
+NDJSON_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+# 1プロセスに渡す分割の大きさ（行の途中では切らない）
+NDJSON_CHUNK_BYTES = 8 * 1024 * 1024
+
+# product_recordで書いた行は先頭が "id" になるため、全体を解析せずにIDを取り出す
+_NDJSON_ID_PATTERN = re.compile(rb'^\{"id": "([^"\\]*)"')
+
+def _ndjson_record(record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Union[ProductSchema, Dict[str, Any]]:
+    """NDJSONの1行分の辞書を商品（fields指定時は指定フィールドだけの辞書）に変換"""
+    if fields is None:
+        return ProductSchema(**record)
+    return {name: record.get(name) for name in fields}
+
+def _ndjson_chunk_ranges(filepath: Path, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """ファイルを行境界で区切ったおよそchunk_bytesごとのバイト範囲"""
+    size = filepath.stat().st_size
+    ranges = []
+    with open(filepath, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(start + chunk_bytes)
+            if start + chunk_bytes < size:
+                f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _parse_ndjson_range(filepath: Path, start: int, end: int, fields: Optional[Sequence[str]]) -> List:
+    """NDJSONのバイト範囲を解析（プロセスプールのワーカーで実行）"""
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return [_ndjson_record(json.loads(line), fields) for line in data.splitlines() if line.strip()]
+
+def file_signature(path: Path) -> List[int]:
+    """ファイルの [サイズ, 更新時刻(ns)]（内容が変わったかの判定用）"""
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+# 列指向ファイルと同時に出力したNDJSONのシグネチャを記録するファイルの接尾辞
+COLUMNAR_SOURCE_SUFFIX = '.source.json'
+
+def columnar_source_path(columnar_path: Path) -> Path:
+    """列指向ファイルの出力元NDJSONの記録ファイル（「<ファイル名>.source.json」）"""
+    return columnar_path.with_name(columnar_path.name + COLUMNAR_SOURCE_SUFFIX)
+
+class NDJSONOffsetIndex:
+    """商品ID→NDJSON内の行のバイト位置の索引
+    
+    索引は「<ファイル名>.idx.json」に保存し、NDJSONのサイズ・更新時刻が変わっていたら作り直す。
+    同じIDの行が複数ある場合は後の行を指す（SQLiteのINSERT OR REPLACEと同じ）。
+    """
+    
+    def __init__(self, ndjson_path: Path):
+        self.ndjson_path = Path(ndjson_path)
+        self.index_path = self.ndjson_path.with_name(self.ndjson_path.name + '.idx.json')
+        self.offsets: Dict[str, int] = {}
+        self._signature: Optional[List[int]] = None
+    
+    def ensure_current(self) -> 'NDJSONOffsetIndex':
+        """保存済みの索引が最新なら読み込み、古ければ作り直して保存"""
+        signature = file_signature(self.ndjson_path)
+        if self._signature == signature:
+            return self
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('signature') == signature:
+                self.offsets = saved['offsets']
+                self._signature = signature
+                return self
+        self.build()
+        return self
+    
+    def build(self):
+        """NDJSONを1回走査して索引を作成・保存"""
+        signature = file_signature(self.ndjson_path)
+        offsets: Dict[str, int] = {}
+        with open(self.ndjson_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    match = _NDJSON_ID_PATTERN.match(line)
+                    product_id = match.group(1).decode('utf-8') if match else json.loads(line).get('id')
+                    if product_id is not None:
+                        offsets[product_id] = offset
+                offset += len(line)
+        self.offsets = offsets
+        self._signature = signature
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'offsets': offsets}, f, ensure_ascii=False)
+    
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """IDの行だけを読み込んで辞書で返す（なければNone）"""
+        self.ensure_current()
+        offset = self.offsets.get(product_id)
+        if offset is None:
+            return None
+        with open(self.ndjson_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+    
+    def __len__(self) -> int:
+        return len(self.ensure_current().offsets)
+
+# FAISSマッピングのバイナリ形式
+# ヘッダー: マジック, バージョン, 埋め込みID数, 商品IDの固定長（バイト）, フィールド数
+# 本体: 商品ID配列（固定長・NUL詰め、埋め込みID順）, 文字列の開始位置配列（uint64）, UTF-8文字列の連結
+FAISS_MAPPING_FILE = 'faiss_mapping.bin'
+FAISS_MAPPING_MAGIC = b'FMAP'
+FAISS_MAPPING_VERSION = 2
+FAISS_MAPPING_FIELDS = ('name', 'category', 'url', 'short_description', 'description')
+_FAISS_MAPPING_HEADER = struct.Struct('<4sIIII')
+_FAISS_MAPPING_OFFSET = struct.Struct('<Q')
+
+def write_faiss_mapping(filepath: Path, mapping: Dict[int, Dict[str, Any]]):
+    """埋め込みID→商品メタデータをバイナリ形式で保存
+    
+    埋め込みIDは0から最大値までの連番として配置する（欠番は空の商品ID）。
+    Noneと空文字列はどちらも空文字列として保存する。
+    """
+    count = max(mapping) + 1 if mapping else 0
+    encoded_ids = {
+        vector_id: metadata['product_id'].encode('utf-8')
+        for vector_id, metadata in mapping.items()
+    }
+    id_width = max((len(product_id) for product_id in encoded_ids.values()), default=0)
+    
+    offsets = [0]
+    blobs = []
+    for vector_id in range(count):
+        metadata = mapping.get(vector_id, {})
+        for name in FAISS_MAPPING_FIELDS:
+            value = (metadata.get(name) or '').encode('utf-8')
+            blobs.append(value)
+            offsets.append(offsets[-1] + len(value))
+    
+    tmp_path = filepath.with_name(filepath.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(_FAISS_MAPPING_HEADER.pack(
+            FAISS_MAPPING_MAGIC, FAISS_MAPPING_VERSION, count, id_width, len(FAISS_MAPPING_FIELDS)
+        ))
+        f.write(b''.join(encoded_ids.get(vector_id, b'').ljust(id_width, b'\0') for vector_id in range(count)))
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        f.write(b''.join(blobs))
+    os.replace(tmp_path, filepath)
+
+class FAISSMappingReader:
+    """faiss_mapping.binをメモリマップして埋め込みID→商品メタデータを引く
+    
+    読み込み時にファイル全体を解析せず、get()は必要な位置だけを読む（O(1)）。
+    """
+    
+    def __init__(self, filepath: Path):
+        self.filepath = Path(filepath)
+        with open(self.filepath, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.id_width, self.field_count = _FAISS_MAPPING_HEADER.unpack_from(self._mmap, 0)
+        if magic != FAISS_MAPPING_MAGIC or version != FAISS_MAPPING_VERSION:
+            self._mmap.close()
+            raise ValueError(f"FAISSマッピングの形式が不正です: {self.filepath}")
+        self._ids_start = _FAISS_MAPPING_HEADER.size
+        self._offsets_start = self._ids_start + self.count * self.id_width
+        self._blob_start = self._offsets_start + (self.count * self.field_count + 1) * _FAISS_MAPPING_OFFSET.size
+    
+    def product_id(self, vector_id: int) -> Optional[str]:
+        """埋め込みIDの商品ID（範囲外・欠番はNone）"""
+        if not 0 <= vector_id < self.count:
+            return None
+        start = self._ids_start + vector_id * self.id_width
+        product_id = self._mmap[start:start + self.id_width].rstrip(b'\0')
+        return product_id.decode('utf-8') if product_id else None
+    
+    def get(self, vector_id: int) -> Optional[Dict[str, Any]]:
+        """埋め込みIDの商品メタデータ（create_faiss_metadata_mappingの値と同じキー）"""
+        product_id = self.product_id(vector_id)
+        if product_id is None:
+            return None
+        metadata: Dict[str, Any] = {'product_id': product_id}
+        position = self._offsets_start + vector_id * self.field_count * _FAISS_MAPPING_OFFSET.size
+        offsets = struct.unpack_from(f'<{self.field_count + 1}Q', self._mmap, position)
+        for i, name in enumerate(FAISS_MAPPING_FIELDS):
+            value = self._mmap[self._blob_start + offsets[i]:self._blob_start + offsets[i + 1]]
+            metadata[name] = value.decode('utf-8') if value else None
+        return metadata
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def close(self):
+        self._mmap.close()
+    
+    def __enter__(self) -> 'FAISSMappingReader':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+@dataclass
+class FanOutResult:
+    """一括エクスポートの結果"""
+    count: int
+    filepaths: List[Path]
+    elapsed: float
+
 class ProductDataExporter:
     """商品データの各種形式エクスポート機能"""
     
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
+        self._ndjson_indexes: Dict[str, NDJSONOffsetIndex] = {}
     
-    def normalize_product_data(self, raw_products: List[Dict]) -> List[ProductSchema]:
-        """生データを標準スキーマに変換"""
-        normalized = []
-        
-        for raw in raw_products:
-            # IDの生成（URLまたは名前のハッシュベース）
-            id_source = raw.get('url', raw.get('name', ''))
-            product_id = hashlib.md5(id_source.encode('utf-8')).hexdigest()[:12]
-            
-            # カテゴリー名の抽出
-            category = raw.get('name', '').replace('治療薬', '').replace('薬', '').strip()
-            
-            # 説明文のクリーニング
-            description = raw.get('description', '')
-            if description:
-                # 改行と余分な空白を整理
-                description = ' '.join(description.split())
-                
-            # 短い説明の生成（最初の100文字）
-            short_desc = description[:100] if description else None
-            
-            # タグの生成（カテゴリーと説明から）
-            tags = [category]
-            if description:
-                # 簡単なキーワード抽出
-                keywords = ['治療', '効果', '成分', '服用', '症状']
-                for keyword in keywords:
-                    if keyword in description:
-                        tags.append(keyword)
-            
-            product = ProductSchema(
-                id=product_id,
-                name=raw.get('name', ''),
-                url=raw.get('url', ''),
-                category=category,
-                category_url=raw.get('category_url', ''),
-                description=description,
-                short_description=short_desc,
-                image_url=raw.get('image_url'),
-                tags=list(set(tags)),  # 重複除去
-                raw_data=raw
-            )
-            
-            normalized.append(product)
-        
-        return normalized
+    def normalize_product_data(self, raw_products: List[Dict], workers: Optional[int] = None) -> List[ProductSchema]:
+        """生データを標準スキーマに変換（NORMALIZE_PARALLEL_MIN_RECORDS件以上は複数プロセスで処理）"""
+        if len(raw_products) < NORMALIZE_PARALLEL_MIN_RECORDS:
+            workers = 1
+        return list(self.iter_normalized_products(raw_products, workers=workers))
     
-    def export_to_json(self, products: List[ProductSchema], filename: str = "products.json"):
-        """JSON形式で出力"""
-        filepath = self.data_dir / filename
+    def iter_normalized_products(
+        self,
+        raw_products: Iterable[Dict],
+        workers: Optional[int] = None,
+        chunk_size: int = NORMALIZE_CHUNK_SIZE
+    ) -> Iterator[ProductSchema]:
+        """生データを標準スキーマに変換しながら1件ずつ返す
         
-        products_dict = [asdict(product) for product in products]
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(products_dict, f, ensure_ascii=False, indent=2)
+        workersが2以上（省略時はCPU数）の場合はchunk_size件ずつプロセスプールで変換する。
+        処理中のチャンクはworkersの2倍までに抑え、入力と同じ順序で返す。
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1:
+            for raw in raw_products:
+                yield normalize_product(raw)
+            return
         
+        raw_iter = iter(raw_products)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: Deque[Future] = deque()
+            while True:
+                while len(pending) < workers * 2:
+                    chunk = list(islice(raw_iter, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(executor.submit(_normalize_chunk, chunk))
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+    
+    def export_to_json(self, products: Iterable[ProductSchema], filename: str = "products.json"):
+        """JSON形式で出力（1件ずつ書き込み）"""
+        filepath = self._export_single(JSONExportSink(self.data_dir / filename), products)
         print(f"💾 JSON形式で保存: {filepath}")
         return filepath
     
-    def export_to_ndjson(self, products: List[ProductSchema], filename: str = "products.ndjson"):
+    def export_to_ndjson(self, products: Iterable[ProductSchema], filename: str = "products.ndjson"):
         """NDJSON（行指向JSON）形式で出力"""
-        filepath = self.data_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            for product in products:
-                f.write(json.dumps(asdict(product), ensure_ascii=False) + '\n')
-        
+        filepath = self._export_single(NDJSONExportSink(self.data_dir / filename), products)
         print(f"💾 NDJSON形式で保存: {filepath}")
         return filepath
     
-    def export_to_csv(self, products: List[ProductSchema], filename: str = "products.csv"):
+    def export_to_csv(self, products: Iterable[ProductSchema], filename: str = "products.csv"):
         """CSV形式で出力（ネストフィールドはJSON文字列化）"""
-        filepath = self.data_dir / filename
-        
-        if not products:
+        # 空かどうかだけを先頭の1件で確認（全件をリスト化しない）
+        products = iter(products)
+        first = next(products, None)
+        if first is None:
             print("⚠️ エクスポートする商品データがありません")
             return None
         
-        # フィールド名を取得
-        fieldnames = list(asdict(products[0]).keys())
-        
-        with open(filepath, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for product in products:
-                row = asdict(product)
-                # リストや辞書はJSON文字列に変換
-                for key, value in row.items():
-                    if isinstance(value, (list, dict)):
-                        row[key] = json.dumps(value, ensure_ascii=False)
-                
-                writer.writerow(row)
-        
+        filepath = self._export_single(CSVExportSink(self.data_dir / filename), chain([first], products))
         print(f"💾 CSV形式で保存: {filepath}")
         return filepath
     
-    def export_to_sqlite(self, products: List[ProductSchema], filename: str = "products.db"):
-        """SQLite形式で出力"""
+    def export_to_sqlite(
+        self,
+        products: Iterable[ProductSchema],
+        filename: str = "products.db",
+        batch_size: int = SQLITE_BATCH_SIZE
+    ):
+        """SQLite形式で出力（WAL・executemanyによるバッチ単位の一括読み込み）"""
+        start = time.perf_counter()
+        sink = SQLiteExportSink(self.data_dir / filename, batch_size=batch_size)
+        filepath = self._export_single(sink, products)
+        
+        elapsed = time.perf_counter() - start
+        rate = sink.count / elapsed if elapsed > 0 else 0.0
+        print(f"💾 SQLite形式で保存: {filepath} ({sink.count}件, {rate:,.0f}行/秒)")
+        if sink.fts_tokenizer is None:
+            print("⚠️ このSQLiteはFTS5に対応していないため全文検索インデックスを作成しませんでした")
+        return filepath
+    
+    def export_to_parquet(self, products: Iterable[ProductSchema], filename: str = "products.parquet"):
+        """Parquet形式で出力（カテゴリー・タグなどは辞書エンコード）"""
+        filepath = self._export_single(ParquetExportSink(self.data_dir / filename), products)
+        print(f"💾 Parquet形式で保存: {filepath}")
+        return filepath
+    
+    def export_to_arrow(self, products: Iterable[ProductSchema], filename: str = "products.arrow"):
+        """Arrow IPC形式で出力（load_columnsでメモリマップしてゼロコピーで読み込める）"""
+        filepath = self._export_single(ArrowExportSink(self.data_dir / filename), products)
+        print(f"💾 Arrow形式で保存: {filepath}")
+        return filepath
+    
+    def load_columns(self, filename: str = "products.arrow", columns: Optional[List[str]] = None):
+        """列指向ファイルをpyarrow.Tableとして読み込む
+        
+        Arrow IPCはメモリマップした領域をそのまま参照する（ゼロコピー）。
+        Parquetもメモリマップで読み、columnsを指定すればその列だけを展開する。
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("列指向形式の読み込みにはpyarrowが必要です（pip install pyarrow）")
         filepath = self.data_dir / filename
+        if filepath.suffix == '.parquet':
+            return pq.read_table(filepath, columns=columns, memory_map=True)
+        with pa.memory_map(str(filepath), 'r') as source:
+            table = pa.ipc.open_stream(source).read_all()
+        return table.select(columns) if columns is not None else table
+    
+    def catalog_stats(
+        self,
+        ndjson_filename: str = "products.ndjson",
+        columnar_filename: str = "products.arrow",
+        missing_category: str = 'その他'
+    ) -> Optional[Dict[str, Any]]:
+        """商品データの基本統計（件数・カテゴリー別件数・タグ件数・項目ごとの入力件数）
         
-        conn = sqlite3.connect(filepath)
-        cursor = conn.cursor()
+        export_manyで現在のNDJSONと同時に出力した列指向ファイルがあれば必要な列だけを読んで
+        列単位で集計し、なければNDJSONを1件ずつ読んで集計する。データがなければNone。
+        """
+        ndjson_path = self.data_dir / ndjson_filename
+        columnar_path = self.data_dir / columnar_filename
+        if (PYARROW_AVAILABLE and columnar_path.exists()
+                and (not ndjson_path.exists() or self._columnar_matches(columnar_filename, ndjson_filename))):
+            table = self.load_columns(columnar_filename, columns=list(CATALOG_STATS_COLUMNS))
+            return summarize_columns(table, missing_category)
+        if not ndjson_path.exists():
+            return None
+        return summarize_products(self.iter_ndjson(ndjson_filename), missing_category)
+    
+    @staticmethod
+    def _export_single(sink, products: Iterable[ProductSchema]) -> Path:
+        try:
+            for product in products:
+                sink.write(*prepare_record(product))
+        finally:
+            sink.close()
+        return sink.filepath
+    
+    def export_many(
+        self,
+        products: Iterable[ProductSchema],
+        targets: List[Tuple[str, str]],
+        parallel: bool = False
+    ) -> FanOutResult:
+        """1回の走査で複数形式に出力
         
-        # テーブル作成
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            url TEXT,
-            category TEXT,
-            category_url TEXT,
-            price TEXT,
-            description TEXT,
-            short_description TEXT,
-            image_url TEXT,
-            ingredients TEXT,
-            dosage TEXT,
-            manufacturer TEXT,
-            stock_status TEXT,
-            tags TEXT,  -- JSON配列として保存
-            scraped_at TEXT,
-            source TEXT,
-            raw_data TEXT,  -- JSON文字列として保存
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        targetsは (形式, ファイル名) のリスト（形式はEXPORT_SINKSのキー）。
+        各商品は1回だけ出力用の辞書（tags・raw_dataのJSON文字列化を含む）に変換して
+        全シンクに渡す。parallel=Trueの場合は
+        シンクごとに書き込みスレッドを立て、全体の所要時間を最も遅いシンクに近づける。
+        """
+        for fmt, _ in targets:
+            if fmt not in EXPORT_SINKS:
+                raise ValueError(f"未対応の出力形式です: {fmt}")
         
-        # データ挿入
-        for product in products:
-            data = asdict(product)
-            # JSONフィールドを文字列化
-            data['tags'] = json.dumps(data['tags'], ensure_ascii=False)
-            data['raw_data'] = json.dumps(data['raw_data'], ensure_ascii=False) if data['raw_data'] else None
-            
-            cursor.execute('''
-            INSERT OR REPLACE INTO products 
-            (id, name, url, category, category_url, price, description, short_description,
-             image_url, ingredients, dosage, manufacturer, stock_status, tags, 
-             scraped_at, source, raw_data)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['id'], data['name'], data['url'], data['category'], 
-                data['category_url'], data['price'], data['description'], 
-                data['short_description'], data['image_url'], data['ingredients'],
-                data['dosage'], data['manufacturer'], data['stock_status'],
-                data['tags'], data['scraped_at'], data['source'], data['raw_data']
-            ))
+        start = time.perf_counter()
+        sinks = [EXPORT_SINKS[fmt](self.data_dir / filename) for fmt, filename in targets]
+        records = map(prepare_record, products)
+        if parallel and len(sinks) > 1:
+            count = self._fan_out_threaded(records, sinks)
+        else:
+            count = self._fan_out(records, sinks)
+        self._record_columnar_sources(sinks)
+        elapsed = time.perf_counter() - start
         
-        conn.commit()
-        conn.close()
+        for sink in sinks:
+            print(f"💾 {sink.FORMAT_LABEL}形式で保存: {sink.filepath}")
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"📤 {count}件を{len(sinks)}ファイルに出力 ({elapsed:.2f}秒, {rate:,.0f}件/秒)")
+        return FanOutResult(count=count, filepaths=[sink.filepath for sink in sinks], elapsed=elapsed)
+    
+    @staticmethod
+    def _record_columnar_sources(sinks: List):
+        """列指向ファイルに、同じ走査で出力したNDJSONのシグネチャを記録
         
-        print(f"💾 SQLite形式で保存: {filepath}")
-        return filepath
+        並列出力ではどのファイルが最後に閉じられるか決まらないため、更新時刻の比較ではなく
+        全シンクを閉じた後のNDJSONのシグネチャでcatalog_statsが列指向ファイルの鮮度を判定する。
+        """
+        sources = {
+            sink.filepath.name: file_signature(sink.filepath)
+            for sink in sinks if isinstance(sink, NDJSONExportSink)
+        }
+        for sink in sinks:
+            if isinstance(sink, _ArrowBatchSink):
+                with open(columnar_source_path(sink.filepath), 'w', encoding='utf-8') as f:
+                    json.dump({'sources': sources}, f, ensure_ascii=False)
+    
+    def _columnar_matches(self, columnar_filename: str, ndjson_filename: str) -> bool:
+        """列指向ファイルが現在のNDJSONと同じ内容から出力されたか"""
+        source_path = columnar_source_path(self.data_dir / columnar_filename)
+        ndjson_path = self.data_dir / ndjson_filename
+        if not source_path.exists() or not ndjson_path.exists():
+            return False
+        with open(source_path, 'r', encoding='utf-8') as f:
+            sources = json.load(f).get('sources', {})
+        return sources.get(ndjson_filename) == file_signature(ndjson_path)
+    
+    @staticmethod
+    def _fan_out(records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], sinks: List) -> int:
+        count = 0
+        try:
+            for record, flat in records:
+                for sink in sinks:
+                    sink.write(record, flat)
+                count += 1
+        finally:
+            for sink in sinks:
+                sink.close()
+        return count
     
-    def load_from_ndjson(self, filename: str = "products.ndjson") -> List[ProductSchema]:
-        """NDJSONファイルから商品データを読み込み"""
+    @staticmethod
+    def _fan_out_threaded(records: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]], sinks: List) -> int:
+        """シンクごとのスレッドに、上限付きの待ち行列でチャンク単位に配る"""
+        queues = [queue.Queue(maxsize=FANOUT_QUEUE_CHUNKS) for _ in sinks]
+        errors: List[BaseException] = []
+        
+        def drain(sink, chunks: queue.Queue):
+            failed = False
+            try:
+                while True:
+                    chunk = chunks.get()
+                    if chunk is None:
+                        break
+                    if failed:
+                        continue  # 生産側を止めないよう、失敗後も待ち行列は読み捨てる
+                    try:
+                        for record, flat in chunk:
+                            sink.write(record, flat)
+                    except BaseException as e:
+                        errors.append(e)
+                        failed = True
+            finally:
+                try:
+                    sink.close()
+                except BaseException as e:
+                    errors.append(e)
+        
+        threads = [
+            threading.Thread(target=drain, args=(sink, chunks), name=f"export-{sink.FORMAT_LABEL}", daemon=True)
+            for sink, chunks in zip(sinks, queues)
+        ]
+        for thread in threads:
+            thread.start()
+        
+        count = 0
+        try:
+            while True:
+                chunk = list(islice(records, FANOUT_CHUNK_SIZE))
+                if not chunk:
+                    break
+                count += len(chunk)
+                # 辞書は全シンクで共有する（シンクは受け取った辞書を変更しない）
+                for chunks in queues:
+                    chunks.put(chunk)
+        finally:
+            for chunks in queues:
+                chunks.put(None)
+            for thread in threads:
+                thread.join()
+        
+        if errors:
+            raise errors[0]
+        return count
+    
+    def iter_ndjson(
+        self,
+        filename: str = "products.ndjson",
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[Union[ProductSchema, Dict[str, Any]]]:
+        """NDJSONファイルから商品データを1件ずつ読み込む
+        
+        fieldsを指定すると、ProductSchemaを作らずに指定フィールドだけの辞書を返す。
+        """
+        filepath = self.data_dir / filename
+        
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield _ndjson_record(json.loads(line), fields)
+    
+    def load_from_ndjson(
+        self,
+        filename: str = "products.ndjson",
+        fields: Optional[Sequence[str]] = None,
+        workers: Optional[int] = None
+    ) -> List[Union[ProductSchema, Dict[str, Any]]]:
+        """NDJSONファイルから商品データを読み込み
+        
+        NDJSON_PARALLEL_MIN_BYTES以上のファイルは行境界で分割し、複数プロセスで解析する
+        （workersで上限を指定、1なら常に単一プロセス）。結果の順序はファイル内の順序と同じ。
+        """
         filepath = self.data_dir / filename
         
         if not filepath.exists():
             print(f"⚠️ ファイルが見つかりません: {filepath}")
             return []
         
-        products = []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                data = json.loads(line.strip())
-                product = ProductSchema(**data)
-                products.append(product)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        ranges = []
+        if workers > 1 and filepath.stat().st_size >= NDJSON_PARALLEL_MIN_BYTES:
+            ranges = _ndjson_chunk_ranges(filepath, NDJSON_CHUNK_BYTES)
+        
+        if len(ranges) > 1:
+            products = []
+            with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+                for chunk in executor.map(
+                    _parse_ndjson_range,
+                    [filepath] * len(ranges),
+                    [start for start, _ in ranges],
+                    [end for _, end in ranges],
+                    [fields] * len(ranges)
+                ):
+                    products.extend(chunk)
+        else:
+            products = list(self.iter_ndjson(filename, fields))
         
         print(f"📂 NDJSONから {len(products)} 件の商品データを読み込み: {filepath}")
         return products
     
-    def create_faiss_metadata_mapping(self, products: List[ProductSchema]) -> Dict[int, Dict]:
-        """FAISSの埋め込みIDと商品メタデータのマッピングを作成"""
+    def count_ndjson(self, filename: str = "products.ndjson") -> int:
+        """NDJSONの商品数（行を解析せずに数える）"""
+        filepath = self.data_dir / filename
+        if not filepath.exists():
+            return 0
+        with open(filepath, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+    
+    def ndjson_index(self, filename: str = "products.ndjson") -> NDJSONOffsetIndex:
+        """NDJSONの商品ID索引（ファイルごとに保持し、更新されていれば作り直す）"""
+        index = self._ndjson_indexes.get(filename)
+        if index is None:
+            index = self._ndjson_indexes[filename] = NDJSONOffsetIndex(self.data_dir / filename)
+        return index.ensure_current()
+    
+    def get_product(self, product_id: str, filename: str = "products.ndjson") -> Optional[ProductSchema]:
+        """商品IDで1件だけ読み込む（ファイル全体は走査しない）"""
+        record = self.ndjson_index(filename).get(product_id)
+        return ProductSchema(**record) if record is not None else None
+    
+    def create_faiss_metadata_mapping(
+        self,
+        products: List[ProductSchema],
+        filename: str = FAISS_MAPPING_FILE
+    ) -> Dict[int, Dict]:
+        """FAISSの埋め込みIDと商品メタデータのマッピングを作成
+        
+        埋め込みIDはproductsの順序なので、productsはFAISSインデックスに追加した順で渡す。
+        FAISSRAGSystemはインデックス保存時に自身のmetadata_listからfaiss_mapping.binを書くため、
+        それ以外の商品列のマッピングは別のファイル名で保存する。
+        """
         mapping = {}
         
         for i, product in enumerate(products):
@@ -228,16 +1083,20 @@ class ProductDataExporter:
                 'name': product.name,
                 'category': product.category,
                 'url': product.url,
-                'short_description': product.short_description
+                'short_description': product.short_description,
+                'description': product.description
             }
         
-        # マッピングをJSONで保存
-        mapping_file = self.data_dir / "faiss_mapping.json"
-        with open(mapping_file, 'w', encoding='utf-8') as f:
-            json.dump(mapping, f, ensure_ascii=False, indent=2)
+        # マッピングをバイナリ形式で保存（FAISSMappingReaderで解析せずに参照できる）
+        mapping_file = self.data_dir / filename
+        write_faiss_mapping(mapping_file, mapping)
         
         print(f"🔗 FAISSマッピングを保存: {mapping_file}")
         return mapping
+    
+    def open_faiss_mapping(self, filename: str = FAISS_MAPPING_FILE) -> FAISSMappingReader:
+        """保存済みのFAISSマッピングをメモリマップで開く"""
+        return FAISSMappingReader(self.data_dir / filename)
 
 def demo_export_pipeline():
     """実際のデータを使ったエクスポートのデモ"""
@@ -270,7 +1129,7 @@ def demo_export_pipeline():
     
     # FAISSマッピング作成
     print("\n🔗 FAISSマッピング作成中...")
-    mapping = exporter.create_faiss_metadata_mapping(normalized_products)
+    mapping = exporter.create_faiss_metadata_mapping(normalized_products, "normalized_faiss_mapping.bin")
     
     # 結果サマリー表示
     print(f"\n📋 正規化後のデータサンプル:")
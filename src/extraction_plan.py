@@ -0,0 +1,158 @@
+"""
+商品ページの抽出プラン
+フィールドごとのCSSセレクタ候補をまとめてコンパイルし、1回のツリー走査で全フィールドを抽出する
+"""
+import logging
+import re
+from typing import List, Dict, Optional, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 商品ページのフィールドごとのセレクタ候補（先頭ほど優先）
+PRODUCT_FIELD_SELECTORS = {
+    'name': ['h1', '.product-title', '.item-title', 'title'],
+    'price': ['.price', '.product-price', '[class*="price"]'],
+    'description': ['.description', '.product-description', '.item-desc'],
+    'category': ['.category', '.breadcrumb', '.product-category'],
+    'image': ['.product-image img', '.item-image img', 'img[alt*="商品"]'],
+}
+
+def resolve_parser_backend(name: str = 'auto') -> str:
+    """BeautifulSoupに渡すパーサー名を決定（autoはlxmlがあればlxml）"""
+    if name == 'auto':
+        return 'lxml' if LXML_AVAILABLE else 'html.parser'
+    if name == 'lxml' and not LXML_AVAILABLE:
+        logger.warning("lxmlがインストールされていないため html.parser を使用します")
+        return 'html.parser'
+    return name
+
+# 単純セレクタ: タグ名、.class、[attr*="value"] の組み合わせ
+_COMPOUND_PATTERN = re.compile(
+    r'^(?P<tag>[a-zA-Z][a-zA-Z0-9]*)?'
+    r'(?P<classes>(?:\.[\w-]+)*)'
+    r'(?:\[(?P<attr>[\w-]+)\*="(?P<value>[^"]*)"\])?$'
+)
+
+class _Compound:
+    """単純セレクタ1つ分の判定条件"""
+
+    __slots__ = ('tag', 'classes', 'attr', 'value')
+
+    def __init__(self, selector: str):
+        match = _COMPOUND_PATTERN.match(selector)
+        if not match or not selector:
+            raise ValueError(f"抽出プランで扱えないセレクタです: {selector}")
+        self.tag = match.group('tag')
+        self.classes = [c for c in match.group('classes').split('.') if c]
+        self.attr = match.group('attr')
+        self.value = match.group('value')
+
+    def matches(self, element: Tag) -> bool:
+        if self.tag and element.name != self.tag:
+            return False
+        if self.classes:
+            element_classes = element.get('class') or []
+            if not all(c in element_classes for c in self.classes):
+                return False
+        if self.attr:
+            attr_value = element.get(self.attr)
+            if attr_value is None:
+                return False
+            if isinstance(attr_value, list):
+                attr_value = ' '.join(attr_value)
+            if self.value not in attr_value:
+                return False
+        return True
+
+class _Selector:
+    """子孫結合子（空白区切り）1段までのセレクタ"""
+
+    __slots__ = ('text', 'ancestor', 'target')
+
+    def __init__(self, selector: str):
+        parts = selector.split()
+        if len(parts) > 2:
+            raise ValueError(f"抽出プランで扱えないセレクタです: {selector}")
+        self.text = selector
+        self.target = _Compound(parts[-1])
+        self.ancestor = _Compound(parts[0]) if len(parts) == 2 else None
+
+    def matches(self, element: Tag) -> bool:
+        if not self.target.matches(element):
+            return False
+        if self.ancestor is None:
+            return True
+        return any(self.ancestor.matches(parent) for parent in element.parents if isinstance(parent, Tag) and parent.name != '[document]')
+
+class ExtractionPlan:
+    """フィールドごとのセレクタ候補を1回のツリー走査で評価する抽出プラン
+
+    evaluate()はselect_one()と同じく、セレクタごとに文書順で最初に一致した要素を返す。
+    より優先度の高いセレクタで値が確定したフィールドの残りのセレクタは評価を省き、
+    全フィールドが確定した時点で走査を打ち切る。
+    """
+
+    def __init__(self, field_selectors: Dict[str, List[str]], required_attrs: Optional[Dict[str, str]] = None):
+        self.field_selectors = field_selectors
+        # 一致した要素がこの属性を持たない場合は次のセレクタに進むフィールド（画像のsrcなど）
+        self.required_attrs = required_attrs or {}
+        # (フィールド名, 優先順位, セレクタ) を平坦化
+        self._selectors: List[Tuple[str, int, _Selector]] = [
+            (field, priority, _Selector(selector))
+            for field, selectors in field_selectors.items()
+            for priority, selector in enumerate(selectors)
+        ]
+
+    def _is_final(self, field: str, element: Tag) -> bool:
+        attr = self.required_attrs.get(field)
+        return attr is None or bool(element.get(attr))
+
+    def evaluate(self, soup: BeautifulSoup) -> Dict[str, List[Optional[Tag]]]:
+        """フィールドごとに、各セレクタに最初に一致した要素のリストを返す
+
+        確定した値より優先度の低いセレクタは評価を省くため、その位置はNoneになる。
+        """
+        results = {field: [None] * len(selectors) for field, selectors in self.field_selectors.items()}
+        remaining = list(self._selectors)
+
+        for element in soup.find_all(True):
+            matched = False
+            for field, priority, selector in remaining:
+                if selector.matches(element):
+                    results[field][priority] = element
+                    matched = True
+            if matched:
+                # 一致済みのセレクタと、確定した値より優先度の低いセレクタを除外
+                remaining = [
+                    (field, priority, selector)
+                    for field, priority, selector in remaining
+                    if results[field][priority] is None and priority < self._resolved_priority(field, results)
+                ]
+                if not remaining:
+                    break
+
+        return results
+
+    def _resolved_priority(self, field: str, results: Dict[str, List[Optional[Tag]]]) -> int:
+        """フィールドの値を確定させた最優先セレクタの順位（未確定ならセレクタ数）"""
+        for priority, element in enumerate(results[field]):
+            if element is not None and self._is_final(field, element):
+                return priority
+        return len(results[field])
+
+    def evaluate_select(self, soup: BeautifulSoup) -> Dict[str, List[Optional[Tag]]]:
+        """セレクタごとにselect_one()で評価（比較・ベンチマーク用）"""
+        return {
+            field: [soup.select_one(selector) for selector in selectors]
+            for field, selectors in self.field_selectors.items()
+        }
+
+PRODUCT_EXTRACTION_PLAN = ExtractionPlan(PRODUCT_FIELD_SELECTORS, required_attrs={'image': 'src'})
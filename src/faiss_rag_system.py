@@ -6,10 +6,15 @@ import json
 import os
 import pickle
 import csv
+import struct
+from pathlib import Path
 from typing import List, Dict, Optional, Any
 import logging
 from dataclasses import dataclass
 
+from src.data_exporter import FAISS_MAPPING_FILE, FAISSMappingReader, stable_product_id, write_faiss_mapping
+from src.product_catalog import ProductCatalog, RankedResults
+
 # カスタム例外クラス
 class ProxyConnectionError(Exception):
     """プロキシ接続エラー"""
@@ -37,10 +42,17 @@ class SearchResult:
     category: Optional[str] = None
     similarity_score: float = 0.0
     metadata: Optional[Dict[str, Any]] = None
+    row_id: Optional[int] = None  # metadata_list上の行番号
 
 class FAISSRAGSystem:
     """FAISS RAGシステム"""
     
+    # 商品単位の重複除去時に不足分の何倍を取得するか
+    COLLAPSE_OVERFETCH = 2
+    
+    # キーワードブーストの対象フィールド
+    SCORE_FIELDS = ('product_name', 'description', 'category')
+    
     def __init__(self):
         """初期化"""
         if not DEPENDENCIES_AVAILABLE:
@@ -203,18 +215,34 @@ class FAISSRAGSystem:
         self.documents = []
         self.dimension = 1536
         
+        # ベクトルID→商品のバイナリマッピング（検索結果の商品情報はここから引く）
+        self.id_mapping: Optional[FAISSMappingReader] = None
+        
+        # 商品単位の重複除去用（ベクトルID → 商品グループID）
+        self.product_groups = None
+        self.group_members = []
+        
+        # スコア調整用に小文字化した商品フィールド（商品名, 説明文, カテゴリ）
+        self.field_texts_lower = []
+        self._keyword_hits_cache = {}
+        
+        # 検索結果が参照する共有カタログ（metadata_listの列指向版）
+        self.catalog = ProductCatalog({})
+        
         # パス設定
         self.data_dir = "./data"
         self.csv_file = os.path.join(self.data_dir, "product_recommend.csv")
         self.index_file = os.path.join(self.data_dir, "faiss_index.bin")
         self.metadata_file = os.path.join(self.data_dir, "metadata.pkl")
         self.documents_file = os.path.join(self.data_dir, "documents.pkl")
+        self.mapping_file = os.path.join(self.data_dir, FAISS_MAPPING_FILE)
         
         self._initialize()
 
     def _initialize(self):
         """初期化"""
-        if os.path.exists(self.index_file) and os.path.exists(self.metadata_file):
+        if os.path.exists(self.index_file) and (
+                os.path.exists(self.mapping_file) or os.path.exists(self.metadata_file)):
             self._load_index()
         else:
             self._build_index()
@@ -250,31 +278,220 @@ class FAISSRAGSystem:
             return []
 
         try:
-            query_embedding = self._get_embedding(query)
+            query_embedding = self._get_query_vector(query)
             if query_embedding is None:
                 return []
 
-            query_embedding = query_embedding.reshape(1, -1)
-            faiss.normalize_L2(query_embedding)
             scores, indices = self.index.search(query_embedding, top_k)
-            
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if idx < len(self.metadata_list):
-                    metadata = self.metadata_list[idx]
-                    result = SearchResult(
-                        product_name=metadata['product_name'],
-                        category=metadata['category'],
-                        description=metadata['description'],
-                        url=metadata['url'],
-                        similarity_score=float(score)
-                    )
-                    results.append(result)
-            return results
+            return self._to_search_results(scores[0], indices[0])
+        except Exception as e:
+            logger.error(f"検索エラー: {e}")
+            return []
+
+    def search_unique_products(self, query: str, top_k: int = 5) -> List[SearchResult]:
+        """商品名単位で重複を除いた上位top_k件を検索
+
+        同一商品のベクトルが複数ある場合でも、ユニークな商品がtop_k件
+        揃うまでエンベディングを再取得せずに追加検索する。
+        """
+        if not self.index or not self.metadata_list:
+            return []
+
+        try:
+            query_embedding = self._get_query_vector(query)
+            if query_embedding is None:
+                return []
+
+            scores, indices = self._collapsed_search(query_embedding, top_k)
+            return self._to_search_results(scores, indices)
         except Exception as e:
             logger.error(f"検索エラー: {e}")
             return []
 
+    def search_ranked(self, query: str, top_k: int = 5) -> RankedResults:
+        """商品単位で重複を除いた検索結果を行番号・スコア配列で返す
+
+        候補を大量に取得して再ランキングする場合でも、結果1件ごとの
+        オブジェクト生成や文字列コピーを行わない。
+        """
+        if not self.index or not self.metadata_list:
+            return RankedResults.empty(self.catalog)
+
+        try:
+            query_embedding = self._get_query_vector(query)
+            if query_embedding is None:
+                return RankedResults.empty(self.catalog)
+
+            scores, indices = self._collapsed_search(query_embedding, top_k)
+            return RankedResults(self.catalog, indices, scores)
+        except Exception as e:
+            logger.error(f"検索エラー: {e}")
+            return RankedResults.empty(self.catalog)
+
+    def _get_query_vector(self, query: str) -> Optional[np.ndarray]:
+        """クエリのエンベディングを検索用に正規化して取得"""
+        query_embedding = self._get_embedding(query)
+        if query_embedding is None:
+            return None
+        query_embedding = query_embedding.reshape(1, -1)
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+
+    def _to_search_results(self, scores, indices) -> List[SearchResult]:
+        """FAISSの検索結果をSearchResultに変換"""
+        results = []
+        for score, idx in zip(scores, indices):
+            if 0 <= idx < len(self.metadata_list):
+                metadata = self._vector_metadata(int(idx))
+                result = SearchResult(
+                    product_name=metadata['product_name'],
+                    category=metadata['category'],
+                    description=metadata['description'],
+                    url=metadata['url'],
+                    similarity_score=float(score),
+                    row_id=int(idx)
+                )
+                results.append(result)
+        return results
+
+    def _vector_metadata(self, vector_id: int) -> Dict[str, Any]:
+        """ベクトルIDの商品メタデータ（faiss_mapping.binを開いていればそこから読む）"""
+        if self.id_mapping is not None:
+            record = self.id_mapping.get(vector_id)
+            if record is not None:
+                return self._mapping_to_metadata(record)
+        return self.metadata_list[vector_id]
+
+    @staticmethod
+    def _mapping_to_metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+        """faiss_mapping.binの1件をmetadata_listの形式に変換"""
+        return {
+            'product_id': record['product_id'],
+            'product_name': record.get('name') or '',
+            'category': record.get('category') or '',
+            'description': record.get('description') or '',
+            'url': record.get('url') or '',
+        }
+
+    def _collapsed_search(self, query_embedding: np.ndarray, top_k: int):
+        """商品グループ単位で畳み込んだ上位top_k件の(スコア, ベクトルID)を返す"""
+        ntotal = min(self.index.ntotal, len(self.metadata_list))
+        top_k = min(top_k, len(self.group_members))
+        if top_k <= 0:
+            return [], []
+
+        # 全ベクトルが別商品なら重複は起こり得ないので1回の検索で済む
+        if len(self.group_members) == ntotal:
+            scores, indices = self.index.search(query_embedding, top_k)
+            return scores[0], indices[0]
+
+        if hasattr(faiss, 'SearchParameters') and hasattr(faiss, 'IDSelectorBatch'):
+            return self._collapsed_search_grouped(query_embedding, top_k, ntotal)
+        return self._collapsed_search_overfetch(query_embedding, top_k, ntotal)
+
+    def _collapsed_search_grouped(self, query_embedding: np.ndarray, top_k: int, ntotal: int):
+        """採用済み商品のベクトルをIDSelectorで除外しながら追加検索"""
+        selected_scores, selected_ids = [], []
+        seen_groups = set()
+        excluded = []
+        params = None
+
+        while len(selected_ids) < top_k:
+            remaining = ntotal - sum(len(ids) for ids in excluded)
+            if remaining <= 0:
+                break
+            fetch_k = min(remaining, (top_k - len(selected_ids)) * self.COLLAPSE_OVERFETCH)
+            if params is None:
+                scores, indices = self.index.search(query_embedding, fetch_k)
+            else:
+                scores, indices = self.index.search(query_embedding, fetch_k, params=params)
+
+            for score, idx in zip(scores[0], indices[0]):
+                if idx < 0 or idx >= ntotal:
+                    continue
+                group = self.product_groups[idx]
+                if group in seen_groups:
+                    continue
+                seen_groups.add(group)
+                excluded.append(self.group_members[group])
+                selected_scores.append(score)
+                selected_ids.append(idx)
+                if len(selected_ids) >= top_k:
+                    break
+
+            if fetch_k >= remaining:
+                break
+            selector = faiss.IDSelectorBatch(np.concatenate(excluded).astype(np.int64))
+            params = faiss.SearchParameters(sel=faiss.IDSelectorNot(selector))
+
+        return selected_scores, selected_ids
+
+    def _collapsed_search_overfetch(self, query_embedding: np.ndarray, top_k: int, ntotal: int):
+        """ユニーク商品がtop_k件揃うまで取得件数を倍々に増やして再検索"""
+        fetch_k = min(ntotal, top_k * self.COLLAPSE_OVERFETCH)
+        while True:
+            scores, indices = self.index.search(query_embedding, fetch_k)
+            selected_scores, selected_ids = [], []
+            seen_groups = set()
+            for score, idx in zip(scores[0], indices[0]):
+                if idx < 0 or idx >= ntotal:
+                    continue
+                group = self.product_groups[idx]
+                if group in seen_groups:
+                    continue
+                seen_groups.add(group)
+                selected_scores.append(score)
+                selected_ids.append(idx)
+                if len(selected_ids) >= top_k:
+                    break
+
+            if len(selected_ids) >= top_k or fetch_k >= ntotal:
+                return selected_scores, selected_ids
+            fetch_k = min(ntotal, fetch_k * 2)
+
+    def _build_product_groups(self):
+        """商品名ごとにベクトルIDをグループ化"""
+        group_by_name = {}
+        groups = []
+        members = []
+        for idx, metadata in enumerate(self.metadata_list):
+            name = metadata.get('product_name', '')
+            group = group_by_name.get(name)
+            if group is None:
+                group = len(members)
+                group_by_name[name] = group
+                members.append([])
+            groups.append(group)
+            members[group].append(idx)
+
+        self.product_groups = groups
+        self.group_members = [np.array(ids, dtype=np.int64) for ids in members]
+
+    def _build_field_texts(self):
+        """カタログを作成し、スコア調整で参照するフィールドを小文字化して保持"""
+        self.catalog = ProductCatalog.from_records(self.metadata_list)
+        self.field_texts_lower = [
+            [(metadata.get(field) or '').lower() for metadata in self.metadata_list]
+            for field in self.SCORE_FIELDS
+        ]
+        self._keyword_hits_cache = {}
+
+    def keyword_field_hits(self, keyword: str) -> np.ndarray:
+        """キーワードが各商品のどのフィールドに含まれるかを返す
+
+        戻り値は (len(SCORE_FIELDS), 商品数) のbool配列。
+        キーワードごとに全商品分を一度だけ計算してキャッシュする。
+        """
+        keyword_lower = keyword.lower()
+        hits = self._keyword_hits_cache.get(keyword_lower)
+        if hits is None:
+            hits = np.array([
+                [keyword_lower in text for text in texts]
+                for texts in self.field_texts_lower
+            ], dtype=bool).reshape(len(self.SCORE_FIELDS), len(self.metadata_list))
+            self._keyword_hits_cache[keyword_lower] = hits
+        return hits
+
     def _build_index(self):
         """インデックス構築"""
         products = self._load_csv_data()
@@ -300,6 +517,7 @@ class FAISSRAGSystem:
             if embedding is not None:
                 self.documents.append(doc)
                 metadata = {
+                    'product_id': stable_product_id(product),
                     'product_name': product.get('商品名', ''),
                     'category': product.get('カテゴリ名', ''),
                     'description': product.get('説明文', ''),
@@ -313,7 +531,10 @@ class FAISSRAGSystem:
             self.index = faiss.IndexFlatIP(self.dimension)
             faiss.normalize_L2(embeddings_matrix)
             self.index.add(embeddings_matrix)
+            self._build_product_groups()
+            self._build_field_texts()
             self._save_index()
+            self._reopen_id_mapping()
 
     def _save_index(self):
         """インデックス保存"""
@@ -324,16 +545,71 @@ class FAISSRAGSystem:
                 pickle.dump(self.metadata_list, f)
             with open(self.documents_file, 'wb') as f:
                 pickle.dump(self.documents, f)
+            self._save_id_mapping()
         except Exception as e:
             logger.error(f"保存エラー: {e}")
 
+    def _save_id_mapping(self):
+        """ベクトルID（metadata_list上の行番号）→商品のバイナリマッピングを保存"""
+        mapping = {}
+        for vector_id, metadata in enumerate(self.metadata_list):
+            # product_id導入前のmetadata.pklはmetadataの項目から商品IDを作る
+            product_id = metadata.get('product_id') or stable_product_id({
+                'name': metadata.get('product_name'),
+                'url': metadata.get('url'),
+                'description': metadata.get('description'),
+            })
+            mapping[vector_id] = {
+                'product_id': product_id,
+                'name': metadata.get('product_name'),
+                'category': metadata.get('category'),
+                'url': metadata.get('url'),
+                'short_description': (metadata.get('description') or '')[:100] or None,
+                'description': metadata.get('description'),
+            }
+        if self.id_mapping is not None:
+            self.id_mapping.close()
+            self.id_mapping = None
+        write_faiss_mapping(Path(self.mapping_file), mapping)
+
+    def _reopen_id_mapping(self):
+        """保存したfaiss_mapping.binを開き直す"""
+        try:
+            self.id_mapping = FAISSMappingReader(Path(self.mapping_file))
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"マッピング読み込みエラー: {e}")
+
+    def _open_id_mapping(self) -> FAISSMappingReader:
+        """faiss_mapping.binを開く
+
+        ファイルがない、faiss_index.binより古い、形式が古い、ベクトル数が合わない場合は
+        metadata.pklから作り直す（既存インデックスの移行）。
+        """
+        try:
+            if os.path.getmtime(self.mapping_file) >= os.path.getmtime(self.index_file):
+                reader = FAISSMappingReader(Path(self.mapping_file))
+                if len(reader) == self.index.ntotal:
+                    return reader
+                reader.close()
+        except (OSError, ValueError, struct.error):
+            pass
+
+        logger.info(f"{self.metadata_file} から {self.mapping_file} を作成します")
+        with open(self.metadata_file, 'rb') as f:
+            self.metadata_list = pickle.load(f)
+        self._save_id_mapping()
+        return FAISSMappingReader(Path(self.mapping_file))
+
     def _load_index(self):
-        """インデックス読み込み"""
+        """インデックス読み込み（商品メタデータはfaiss_mapping.binから読む）"""
         try:
             self.index = faiss.read_index(self.index_file)
-            with open(self.metadata_file, 'rb') as f:
-                self.metadata_list = pickle.load(f)
-            with open(self.documents_file, 'rb') as f:
-                self.documents = pickle.load(f)
+            self.id_mapping = self._open_id_mapping()
+            self.metadata_list = [
+                self._mapping_to_metadata(self.id_mapping.get(vector_id) or {'product_id': ''})
+                for vector_id in range(len(self.id_mapping))
+            ]
+            self._build_product_groups()
+            self._build_field_texts()
         except Exception as e:
             logger.error(f"読み込みエラー: {e}")
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+SQLite FTS5による商品検索
+エクスポート済みのproducts.dbを読み取り専用で開き、bm25()で順位付けした全文検索を行う
+（インデックスはディスク上にあるため、複数プロセスで共有してもメモリ使用量が増えない）
+"""
+import argparse
+import re
+import sqlite3
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.data_exporter import SQLITE_FTS_COLUMNS, SQLITE_FTS_TABLE
+
+# bm25()の列ごとの重み（SQLITE_FTS_COLUMNSの順: 商品名, 説明, 有効成分, タグ）
+FTS_COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+# trigramトークナイザーでMATCHできる最短の語長（これより短い語はLIKEで照合）
+TRIGRAM_MIN_LENGTH = 3
+
+# 他に語がある場合に検索語として使う最短の語長
+QUERY_TERM_MIN_LENGTH = 2
+
+# クエリを文字種の連続（漢字・カタカナ・英数字・ひらがな）で区切る
+# 「頭痛がひどいので」のような空白のない文も「頭痛」「がひどいので」に分かれる
+_QUERY_TERM_PATTERN = re.compile(r'[一-龯々〆ヵヶ]+|[ァ-ヴー]+|[0-9A-Za-z]+|[ぁ-ゖ]+')
+_HIRAGANA_PATTERN = re.compile(r'[ぁ-ゖ]+')
+
+def split_query_terms(query: str) -> List[str]:
+    """クエリを検索語に分割（重複除去、出現順）
+
+    NFKC正規化して文字種の連続ごとに区切り、助詞などのひらがなだけの語と
+    「薬」「何」のような1文字の語は除く（それで語がなくなる場合は残す）。
+    """
+    terms = _QUERY_TERM_PATTERN.findall(unicodedata.normalize('NFKC', query))
+    content_terms = [term for term in terms if not _HIRAGANA_PATTERN.fullmatch(term)] or terms
+    long_terms = [term for term in content_terms if len(term) >= QUERY_TERM_MIN_LENGTH]
+    return list(dict.fromkeys(long_terms or content_terms))
+
+@dataclass
+class FTSSearchResult:
+    """全文検索結果"""
+    id: str
+    name: str
+    url: Optional[str]
+    category: Optional[str]
+    short_description: Optional[str]
+    image_url: Optional[str]
+    score: float
+
+class FTSSearchBackend:
+    """products.dbのFTS5テーブルを使う検索バックエンド（読み取り専用）"""
+
+    def __init__(self, db_path: str = "data/products.db"):
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"データベースが見つかりません: {self.db_path}")
+        self.conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute('PRAGMA query_only=1')
+        self.tokenizer = self._detect_tokenizer()
+        if self.tokenizer is None:
+            raise ValueError(f"全文検索テーブル {SQLITE_FTS_TABLE} がありません。export_to_sqliteで再エクスポートしてください")
+
+    def _detect_tokenizer(self) -> Optional[str]:
+        row = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (SQLITE_FTS_TABLE,)
+        ).fetchone()
+        if row is None:
+            return None
+        match = re.search(r"tokenize\s*=\s*'(\w+)", row[0])
+        return match.group(1) if match else 'unicode61'
+
+    @staticmethod
+    def _phrase(term: str) -> str:
+        """MATCH式のフレーズとしてエスケープ"""
+        return '"' + term.replace('"', '""') + '"'
+
+    def _split_terms(self, query: str) -> Tuple[List[str], List[str]]:
+        """クエリの語をMATCHで照合する語とLIKEで照合する語に分ける"""
+        terms = split_query_terms(query)
+        if self.tokenizer != 'trigram':
+            # unicode61では日本語の文が1語になり部分一致できないため、すべてLIKEで照合
+            return [], terms
+        match_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_LENGTH]
+        like_terms = [term for term in terms if len(term) < TRIGRAM_MIN_LENGTH]
+        return match_terms, like_terms
+
+    def search(self, query: str, top_k: int = 5) -> List[FTSSearchResult]:
+        """クエリの語のいずれかを含む商品をスコア順に返す
+
+        クエリはsplit_query_terms()で語に分ける。3文字以上の語はbm25()、
+        それより短い語は一致した列の重みの合計でスコア化し、両方に一致した商品はスコアを合算する。
+        """
+        match_terms, like_terms = self._split_terms(query)
+        scores: Dict[int, float] = {}
+
+        if match_terms:
+            expression = ' OR '.join(self._phrase(term) for term in match_terms)
+            weights = ', '.join(str(weight) for weight in FTS_COLUMN_WEIGHTS)
+            # bm25()は一致度が高いほど小さい（負の）値を返すため符号を反転
+            for rowid, rank in self.conn.execute(
+                f'SELECT rowid, bm25({SQLITE_FTS_TABLE}, {weights}) FROM {SQLITE_FTS_TABLE} '
+                f'WHERE {SQLITE_FTS_TABLE} MATCH ?',
+                (expression,)
+            ):
+                scores[rowid] = scores.get(rowid, 0.0) - rank
+
+        for term in like_terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            # NULLの列（ingredientsなど）はLIKEの結果もNULLになるため空文字列として照合
+            column_scores = ' + '.join(
+                f"(IFNULL({column}, '') LIKE ? ESCAPE '\\') * {weight}"
+                for column, weight in zip(SQLITE_FTS_COLUMNS, FTS_COLUMN_WEIGHTS)
+            )
+            conditions = ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in SQLITE_FTS_COLUMNS)
+            params = [pattern] * (2 * len(SQLITE_FTS_COLUMNS))
+            for rowid, score in self.conn.execute(
+                f'SELECT rowid, {column_scores} FROM {SQLITE_FTS_TABLE} WHERE {conditions}',
+                params
+            ):
+                scores[rowid] = scores.get(rowid, 0.0) + score
+
+        if not scores:
+            return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return self._fetch_results(ranked)
+
+    def _fetch_results(self, ranked: List[Tuple[int, float]]) -> List[FTSSearchResult]:
+        rowids = [rowid for rowid, _ in ranked]
+        placeholders = ', '.join('?' * len(rowids))
+        rows = {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                f'SELECT rowid, id, name, url, category, short_description, image_url '
+                f'FROM products WHERE rowid IN ({placeholders})',
+                rowids
+            )
+        }
+        return [
+            FTSSearchResult(*rows[rowid], score=score)
+            for rowid, score in ranked if rowid in rows
+        ]
+
+    def close(self):
+        self.conn.close()
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="products.dbの全文検索")
+    parser.add_argument("query", help="検索キーワードまたは文")
+    parser.add_argument("--db", default="data/products.db", help="エクスポートしたSQLiteファイル")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = FTSSearchBackend(args.db)
+    try:
+        results = backend.search(args.query, top_k=args.top_k)
+    finally:
+        backend.close()
+
+    if not results:
+        print("❌ 該当する商品が見つかりませんでした")
+        return
+    print(f"📋 検索結果 ({len(results)} 件, tokenizer={backend.tokenizer}):")
+    for i, result in enumerate(results, 1):
+        print(f"\n{i}. {result.name}  (スコア: {result.score:.3f})")
+        if result.category:
+            print(f"   カテゴリー: {result.category}")
+        if result.url:
+            print(f"   URL: {result.url}")
+
+if __name__ == "__main__":
+    main()
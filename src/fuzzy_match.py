@@ -0,0 +1,184 @@
+"""
+商品名・有効成分のあいまい検索（SymSpell方式の削除辞書）
+「カマグラゴルド」「タダライス」のような入力ミスを編集距離2以内で補正する
+"""
+import re
+from typing import List, Dict, Iterable, Optional, Set, Tuple
+
+from src.product_catalog import ProductCatalog
+from src.typeahead import normalize_kana_key
+
+# 補正候補の元になるフィールド
+FUZZY_FIELDS = ('product_name', 'ingredient')
+
+# 文字種（漢字・カタカナ・ひらがな・英数字）の連続
+# 「カマグラゴルドの効果」のような空白のないクエリも「カマグラゴルド」「の」「効果」に分かれる
+_TOKEN_PATTERN = re.compile(
+    r'[一-龯々〆ヵヶ]+|[ァ-ヴーｦ-ﾟ]+|[ぁ-ゖ]+|[0-9A-Za-z０-９Ａ-Ｚａ-ｚ]+'
+)
+
+def split_tokens(text: str) -> List[str]:
+    """テキストを文字種の連続ごとの語に分割"""
+    return _TOKEN_PATTERN.findall(text)
+
+def _deletes(key: str, max_distance: int) -> Set[str]:
+    """keyから最大max_distance文字を削除した文字列の集合（key自身を含む）"""
+    results = {key}
+    frontier = {key}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for text in frontier:
+            if len(text) <= 1:
+                continue
+            for i in range(len(text)):
+                next_frontier.add(text[:i] + text[i + 1:])
+        next_frontier -= results
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """制限付きDamerau-Levenshtein距離（隣接文字の入れ替えを1とする）
+
+    max_distanceを超えることが確定した時点でmax_distance + 1を返す。
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class DeletionIndex:
+    """削除辞書による編集距離検索インデックス
+
+    登録語ごとに最大MAX_EDIT_DISTANCE文字を削除した文字列を事前にキー化しておき、
+    検索時はクエリ側の削除文字列でハッシュ引きした候補だけを距離計算で確認する。
+    """
+
+    MAX_EDIT_DISTANCE = 2
+    # この文字数未満の語は補正しない（短い語は誤補正しやすいため）
+    MIN_CORRECTION_LENGTH = 4
+    # この文字数以上の語だけ編集距離2まで補正する
+    DISTANCE_2_MIN_LENGTH = 7
+
+    __slots__ = ('terms', 'weights', 'keys', '_deletes', '_key_to_term', 'known_keys')
+
+    def __init__(self, term_weights: Dict[str, float], known_texts: Iterable[str] = ()):
+        self.terms: List[str] = []
+        self.weights: List[float] = []
+        self.keys: List[str] = []
+        self._key_to_term: Dict[str, int] = {}
+        self._deletes: Dict[str, List[int]] = {}
+
+        for term, weight in term_weights.items():
+            key = normalize_kana_key(term)
+            if not key:
+                continue
+            position = self._key_to_term.get(key)
+            if position is not None:
+                self.weights[position] += weight
+                continue
+            position = len(self.terms)
+            self._key_to_term[key] = position
+            self.terms.append(term)
+            self.weights.append(weight)
+            self.keys.append(key)
+            for deleted in _deletes(key, self.MAX_EDIT_DISTANCE):
+                self._deletes.setdefault(deleted, []).append(position)
+
+        # 補正不要な語の照合キー（登録語と、カタログのテキスト・その文字種ごとの語）
+        self.known_keys: Set[str] = set(self.keys)
+        for text in known_texts:
+            self.known_keys.add(normalize_kana_key(text))
+            self.known_keys.update(normalize_kana_key(token) for token in split_tokens(text))
+
+    @classmethod
+    def from_catalog(cls, catalog: ProductCatalog, fields=FUZZY_FIELDS) -> 'DeletionIndex':
+        """商品カタログの商品名・有効成分から辞書を構築（重みは出現商品数）
+
+        カタログの他の列（カテゴリ・検索キーワードなど）に含まれる語は補正しない。
+        """
+        term_weights: Dict[str, float] = {}
+        for field in fields:
+            for value in catalog.column(field):
+                value = value.strip()
+                if value:
+                    term_weights[value] = term_weights.get(value, 0.0) + 1.0
+        known_texts = [
+            value
+            for field, column in catalog.columns.items() if field not in ('url', 'image_url')
+            for value in column if value
+        ]
+        return cls(term_weights, known_texts)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def lookup(self, text: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Tuple[str, int]]:
+        """編集距離max_distance以内の登録語を (語, 距離) の距離・人気順で返す"""
+        if max_distance is None:
+            max_distance = self.MAX_EDIT_DISTANCE
+        max_distance = min(max_distance, self.MAX_EDIT_DISTANCE)
+        key = normalize_kana_key(text)
+        if not key:
+            return []
+
+        exact = self._key_to_term.get(key)
+        if exact is not None:
+            return [(self.terms[exact], 0)]
+
+        candidates: Set[int] = set()
+        for deleted in _deletes(key, max_distance):
+            candidates.update(self._deletes.get(deleted, ()))
+
+        matches = []
+        for position in candidates:
+            distance = edit_distance(key, self.keys[position], max_distance)
+            if distance <= max_distance:
+                matches.append((distance, -self.weights[position], position))
+        matches.sort()
+        return [(self.terms[position], distance) for distance, _, position in matches[:limit]]
+
+    def correct(self, word: str) -> Optional[str]:
+        """入力ミスとみなせる語を登録語に補正（補正不要・候補なしならNone）"""
+        key = normalize_kana_key(word)
+        if len(key) < self.MIN_CORRECTION_LENGTH or key in self.known_keys:
+            return None
+        max_distance = 2 if len(key) >= self.DISTANCE_2_MIN_LENGTH else 1
+        matches = self.lookup(key, max_distance=max_distance, limit=1)
+        if not matches or matches[0][1] == 0:
+            return None
+        return matches[0][0]
+
+    def correct_word(self, word: str) -> str:
+        """空白区切りの1語を補正（語全体で補正できなければ文字種の連続ごとに補正）"""
+        corrected = self.correct(word)
+        if corrected is not None:
+            return corrected
+        return _TOKEN_PATTERN.sub(lambda match: self.correct(match.group()) or match.group(), word)
+
+    def correct_query(self, query: str) -> str:
+        """クエリ中の語ごとに入力ミスを補正したクエリを返す
+
+        空白区切りの語に加え、その中の文字種の連続（「カマグラゴルドの効果」の「カマグラゴルド」）も補正する。
+        同じ文字種の語が続く場合（漢字の複合語など）は1つの連続として扱うため、その一部だけの入力ミスは補正しない。
+        """
+        words = query.split()
+        corrected = [self.correct_word(word) for word in words]
+        if corrected == words:
+            return query
+        return " ".join(corrected)
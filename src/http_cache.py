@@ -0,0 +1,89 @@
+"""
+スクレイパー用の永続HTTPキャッシュ
+ETag/Last-Modifiedを保存し、再クロール時に条件付きGETで未変更ページの再取得を省く
+"""
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+@dataclass
+class CachedResponse:
+    """キャッシュ済みレスポンス"""
+    url: str
+    content: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: Optional[str] = None
+
+class HTTPCache:
+    """SQLiteに保存するHTTPレスポンスキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, db_path: str = "data/http_cache.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content BLOB NOT NULL,
+            fetched_at TEXT
+        )
+        ''')
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """URLのキャッシュを取得"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT url, content, etag, last_modified, fetched_at FROM responses WHERE url = ?',
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(url=row[0], content=row[1], etag=row[2], last_modified=row[3], fetched_at=row[4])
+
+    def store(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+        """レスポンスを保存（検証子のないレスポンスは条件付きGETに使えないので保存しない）"""
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (url, etag, last_modified, content, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                (url, etag, last_modified, content, datetime.utcnow().isoformat())
+            )
+            self.conn.commit()
+
+    def touch(self, url: str):
+        """304応答で再検証できたキャッシュの取得日時を更新"""
+        with self._lock:
+            self.conn.execute(
+                'UPDATE responses SET fetched_at = ? WHERE url = ?',
+                (datetime.utcnow().isoformat(), url)
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def conditional_headers(cached: Optional[CachedResponse]) -> Dict[str, str]:
+        """キャッシュの検証子から条件付きGETのヘッダーを作成"""
+        headers = {}
+        if cached is None:
+            return headers
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        return headers
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
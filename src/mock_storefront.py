@@ -0,0 +1,413 @@
+"""
+スクレイパー負荷試験用のモックストア
+本番サイトの代わりに、生成した商品・カテゴリページとrobots.txt・サイトマップをローカルで配信する
+（応答遅延・エラー率・ETag/Last-Modifiedの有無を設定可能）
+"""
+import argparse
+import gzip
+import hashlib
+import html
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MOCK_CATEGORIES = [
+    'ED治療薬', 'AGA治療薬', 'ダイエット', '美容・スキンケア', '性病・感染症の治療薬',
+    'EDサプリ', '媚薬', '睡眠サポート', '禁煙補助', 'アレルギー'
+]
+MOCK_INGREDIENTS = [
+    'シルデナフィル', 'タダラフィル', 'バルデナフィル', 'フィナステリド', 'デュタステリド',
+    'ミノキシジル', 'オルリスタット', 'トレチノイン', 'アジスロマイシン', 'メラトニン'
+]
+
+# サイトマップ1ファイルあたりの商品URL数
+SITEMAP_CHUNK_SIZE = 100
+
+@dataclass
+class MockProduct:
+    """モックストアの商品"""
+    product_id: int
+    name: str
+    category_id: int
+    ingredient: str
+    price: int
+    updated_at: datetime
+    version: int = 1
+
+@dataclass
+class MockStorefrontConfig:
+    """モックストアの応答設定"""
+    num_products: int = 200
+    num_categories: int = 10
+    latency: float = 0.0  # 応答ごとの遅延（秒）
+    latency_jitter: float = 0.0  # 遅延に加える0〜jitter秒のばらつき
+    error_rate: float = 0.0  # エラー応答を返す割合（0〜1）
+    error_status: int = 503
+    retry_after: Optional[int] = None  # エラー応答に付けるRetry-After（秒）
+    slow_rate: float = 0.0  # 極端に遅い応答を返す割合（0〜1、タイムアウトの確認用）
+    slow_latency: float = 30.0  # 遅い応答の遅延（秒）
+    etag: bool = True  # ETagを付与しIf-None-Matchに304で応答する
+    last_modified: bool = True  # Last-Modifiedを付与しIf-Modified-Sinceに304で応答する
+    sitemap: bool = True  # robots.txtとサイトマップを配信する
+    home_product_links: int = 10  # トップページに載せる商品リンク数
+    filler_paragraphs: int = 20  # 商品ページの本文量（実際のページに近いサイズにする）
+    seed: int = 42
+
+class MockCorpus:
+    """モックストアで配信する商品とページの生成"""
+
+    def __init__(self, config: MockStorefrontConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        base_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.products: Dict[int, MockProduct] = {}
+        for product_id in range(1, config.num_products + 1):
+            ingredient = MOCK_INGREDIENTS[product_id % len(MOCK_INGREDIENTS)]
+            self.products[product_id] = MockProduct(
+                product_id=product_id,
+                name=f"{ingredient}錠 {product_id:04d}",
+                category_id=product_id % config.num_categories + 1,
+                ingredient=ingredient,
+                price=rng.randrange(1000, 20000, 10),
+                updated_at=base_time + timedelta(hours=product_id)
+            )
+        self._lock = threading.Lock()
+
+    def category_name(self, category_id: int) -> str:
+        return MOCK_CATEGORIES[(category_id - 1) % len(MOCK_CATEGORIES)] + (
+            f" {category_id}" if category_id > len(MOCK_CATEGORIES) else ''
+        )
+
+    def category_products(self, category_id: int) -> List[MockProduct]:
+        return [product for product in self.products.values() if product.category_id == category_id]
+
+    def update_products(self, product_ids: Iterable[int], updated_at: Optional[datetime] = None):
+        """商品を更新済みにする（ページ内容・ETag・lastmodが変わる）"""
+        updated_at = updated_at or datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            for product_id in product_ids:
+                product = self.products.get(product_id)
+                if product is not None:
+                    product.version += 1
+                    product.updated_at = updated_at
+
+    @staticmethod
+    def product_path(product_id: int) -> str:
+        return f"/products/{product_id}/"
+
+    def render_home(self) -> str:
+        category_links = ''.join(
+            f'<li><a href="/category/{category_id}/">{html.escape(self.category_name(category_id))}</a></li>'
+            for category_id in range(1, self.config.num_categories + 1)
+        )
+        product_links = ''.join(
+            f'<li><a class="product-link" href="{self.product_path(product.product_id)}">{html.escape(product.name)}</a></li>'
+            for product in list(self.products.values())[:self.config.home_product_links]
+        )
+        return (
+            '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>モックストア</title></head><body>'
+            f'<nav class="global-nav"><ul>{category_links}</ul></nav>'
+            f'<section class="ranking"><h2>人気ランキング</h2><ul>{product_links}</ul></section>'
+            '</body></html>'
+        )
+
+    def render_category(self, category_id: int) -> str:
+        name = html.escape(self.category_name(category_id))
+        items = ''.join(
+            '<li class="item">'
+            f'<a href="{self.product_path(product.product_id)}">{html.escape(product.name)}</a>'
+            f'<span class="item-price">¥{product.price:,}</span></li>'
+            for product in self.category_products(category_id)
+        )
+        return (
+            f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{name}</title></head><body>'
+            f'<h1 class="category-title">{name}</h1><ul class="item-list">{items}</ul>'
+            '</body></html>'
+        )
+
+    def render_product(self, product: MockProduct) -> str:
+        name = html.escape(product.name)
+        category = html.escape(self.category_name(product.category_id))
+        filler = ''.join(
+            f'<p>{html.escape(product.ingredient)}を有効成分とする医薬品です。用法・用量を守って服用してください。（{i + 1}）</p>'
+            for i in range(self.config.filler_paragraphs)
+        )
+        related = ''.join(
+            f'<li><a href="{self.product_path(related_id)}">関連商品 {related_id}</a></li>'
+            for related_id in (product.product_id % self.config.num_products + 1, (product.product_id + 1) % self.config.num_products + 1)
+        )
+        return (
+            f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{name} | モックストア</title></head><body>'
+            f'<nav class="breadcrumb"><a href="/">ホーム</a> &gt; <a href="/category/{product.category_id}/">{category}</a></nav>'
+            f'<div class="product-image"><img src="/images/{product.product_id}.jpg" alt="{name} 商品画像"></div>'
+            f'<h1 class="product-title">{name}</h1>'
+            f'<span class="category">{category}</span>'
+            f'<div class="price">¥{product.price:,}</div>'
+            f'<div class="description">{name}は{html.escape(product.ingredient)}を含む医薬品です。（改訂{product.version}）</div>'
+            f'<div class="notes">{filler}</div>'
+            f'<ul class="related">{related}</ul>'
+            '</body></html>'
+        )
+
+    def render_robots(self, base_url: str) -> str:
+        lines = ['User-agent: *', 'Disallow: /cart/']
+        if self.config.sitemap:
+            lines.append(f'Sitemap: {base_url}/sitemap_index.xml')
+        return '\n'.join(lines) + '\n'
+
+    def _sitemap_chunks(self) -> List[List[MockProduct]]:
+        products = list(self.products.values())
+        return [products[i:i + SITEMAP_CHUNK_SIZE] for i in range(0, len(products), SITEMAP_CHUNK_SIZE)]
+
+    def render_sitemap_index(self, base_url: str) -> str:
+        entries = ''.join(
+            f'<sitemap><loc>{base_url}/sitemaps/products-{index}.xml.gz</loc>'
+            f'<lastmod>{max(product.updated_at for product in chunk).isoformat()}</lastmod></sitemap>'
+            for index, chunk in enumerate(self._sitemap_chunks())
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+        )
+
+    def render_sitemap(self, base_url: str, index: int) -> Optional[bytes]:
+        chunks = self._sitemap_chunks()
+        if not 0 <= index < len(chunks):
+            return None
+        entries = ''.join(
+            f'<url><loc>{base_url}{self.product_path(product.product_id)}</loc>'
+            f'<lastmod>{product.updated_at.isoformat()}</lastmod></url>'
+            for product in chunks[index]
+        )
+        xml = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+        )
+        return gzip.compress(xml.encode('utf-8'), mtime=0)
+
+    def resolve(self, path: str, base_url: str) -> Optional[Tuple[bytes, str, Optional[datetime]]]:
+        """パスに対応する (本文, Content-Type, 更新日時) を返す（存在しなければNone）"""
+        path = path.split('?', 1)[0]
+        parts = [part for part in path.split('/') if part]
+        html_type = 'text/html; charset=utf-8'
+        with self._lock:
+            if not parts:
+                return self.render_home().encode('utf-8'), html_type, None
+            if parts == ['robots.txt']:
+                return self.render_robots(base_url).encode('utf-8'), 'text/plain; charset=utf-8', None
+            if self.config.sitemap and parts == ['sitemap_index.xml']:
+                return self.render_sitemap_index(base_url).encode('utf-8'), 'application/xml', None
+            if self.config.sitemap and len(parts) == 2 and parts[0] == 'sitemaps':
+                name = parts[1]
+                if name.startswith('products-') and name.endswith('.xml.gz') and name[9:-7].isdigit():
+                    body = self.render_sitemap(base_url, int(name[9:-7]))
+                    if body is not None:
+                        return body, 'application/gzip', None
+                return None
+            if len(parts) == 2 and parts[1].isdigit():
+                item_id = int(parts[1])
+                if parts[0] == 'category' and 1 <= item_id <= self.config.num_categories:
+                    return self.render_category(item_id).encode('utf-8'), html_type, None
+                if parts[0] == 'products' and item_id in self.products:
+                    product = self.products[item_id]
+                    return self.render_product(product).encode('utf-8'), html_type, product.updated_at
+        return None
+
+    def write_fixtures(self, directory: str, limit: Optional[int] = None) -> int:
+        """商品ページをHTMLファイルとして書き出し、書き出した件数を返す（パーサーのベンチマーク用）"""
+        output_dir = Path(directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        products = list(self.products.values())[:limit]
+        for product in products:
+            (output_dir / f"mock_product_{product.product_id:04d}.html").write_text(
+                self.render_product(product), encoding='utf-8'
+            )
+        return len(products)
+
+class _StorefrontHandler(BaseHTTPRequestHandler):
+    """モックストアのリクエストハンドラ"""
+
+    server_version = "MockStorefront/1.0"
+
+    def do_GET(self):
+        storefront: 'MockStorefront' = self.server.storefront
+        config = storefront.config
+        storefront.wait_latency()
+
+        if storefront.should_fail():
+            self._send(config.error_status, b'', record=storefront)
+            return
+
+        base_url = f"http://{self.headers.get('Host') or '%s:%d' % self.server.server_address[:2]}"
+        resolved = storefront.corpus.resolve(self.path, base_url)
+        if resolved is None:
+            self._send(404, b'Not Found', record=storefront)
+            return
+
+        body, content_type, updated_at = resolved
+        headers = {'Content-Type': content_type}
+        etag = f'"{hashlib.md5(body).hexdigest()}"' if config.etag else None
+        if etag:
+            headers['ETag'] = etag
+        if config.last_modified and updated_at is not None:
+            headers['Last-Modified'] = format_datetime(updated_at, usegmt=True)
+
+        if self._not_modified(etag, updated_at if config.last_modified else None):
+            self._send(304, b'', headers={key: value for key, value in headers.items() if key != 'Content-Type'}, record=storefront)
+            return
+        self._send(200, body, headers=headers, record=storefront)
+
+    def _not_modified(self, etag: Optional[str], updated_at: Optional[datetime]) -> bool:
+        """条件付きGETで未変更と判定できるか（If-None-MatchをIf-Modified-Sinceより優先）"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            if etag is None:
+                return False
+            candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+            return '*' in candidates or etag in candidates
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since and updated_at is not None:
+            try:
+                return updated_at.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None, record: 'MockStorefront' = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        if status in (429, 503) and record is not None and record.config.retry_after is not None:
+            self.send_header('Retry-After', str(record.config.retry_after))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if record is not None:
+            record.record_response(status, len(body))
+
+    def log_message(self, format, *args):
+        # 負荷試験中のアクセスログは出力しない
+        pass
+
+class _StorefrontServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 既定の待ち行列（5）では並列クロール時に接続が溢れ、SYN再送で約1秒待たされる
+    request_queue_size = 128
+
+class MockStorefront:
+    """モックストアのHTTPサーバー（バックグラウンドスレッドで起動）
+
+    with MockStorefront(MockStorefrontConfig(latency=0.05)) as store:
+        OkusuriScraper(base_url=store.url).scrape_products()
+    """
+
+    def __init__(self, config: Optional[MockStorefrontConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or MockStorefrontConfig()
+        self.corpus = MockCorpus(self.config)
+        self.server = _StorefrontServer((host, port), _StorefrontHandler)
+        self.server.storefront = self
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self.status_counts: Dict[int, int] = {}
+        self.bytes_sent = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'MockStorefront':
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-storefront", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'MockStorefront':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def wait_latency(self):
+        delay = self.config.latency
+        with self._lock:
+            if self.config.latency_jitter > 0:
+                delay += self._random.uniform(0, self.config.latency_jitter)
+            if self.config.slow_rate > 0 and self._random.random() < self.config.slow_rate:
+                delay += self.config.slow_latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.config.error_rate
+
+    def record_response(self, status: int, size: int):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.bytes_sent += size
+
+    def reset_counts(self):
+        with self._lock:
+            self.status_counts = {}
+            self.bytes_sent = 0
+
+    @property
+    def request_count(self) -> int:
+        return sum(self.status_counts.values())
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="スクレイパー負荷試験用のモックストア")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--products", type=int, default=200, help="商品数")
+    parser.add_argument("--categories", type=int, default=10, help="カテゴリ数")
+    parser.add_argument("--latency", type=float, default=0.0, help="応答遅延（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラー応答の割合（0〜1）")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="極端に遅い応答の割合（0〜1）")
+    parser.add_argument("--no-etag", action="store_true", help="ETagを付与しない")
+    parser.add_argument("--no-sitemap", action="store_true", help="サイトマップを配信しない")
+    parser.add_argument("--write-fixtures", metavar="DIR", help="商品ページをHTMLファイルに書き出して終了")
+    args = parser.parse_args()
+
+    config = MockStorefrontConfig(
+        num_products=args.products,
+        num_categories=args.categories,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        etag=not args.no_etag,
+        sitemap=not args.no_sitemap
+    )
+
+    if args.write_fixtures:
+        count = MockCorpus(config).write_fixtures(args.write_fixtures)
+        print(f"✅ 商品ページを{count}件書き出しました: {args.write_fixtures}")
+        return
+
+    storefront = MockStorefront(config, port=args.port)
+    print(f"🏪 モックストアを起動しました: {storefront.url} （Ctrl+Cで終了）")
+    try:
+        storefront.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        storefront.server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+HTMLパーサーのマイクロベンチマーク
+保存済みの商品ページを使い、パーサーバックエンドと抽出方式ごとの処理速度（ページ/秒）を計測する
+"""
+import argparse
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Tuple
+
+from src.extraction_plan import PRODUCT_EXTRACTION_PLAN, LXML_AVAILABLE
+from src.scraper import OkusuriScraper
+
+DEFAULT_FIXTURES_DIR = "data/fixtures/html"
+
+# 抽出方式: 抽出プラン（1回の走査）とセレクタごとのselect_one()
+EXTRACTION_METHODS = {
+    'plan': PRODUCT_EXTRACTION_PLAN.evaluate,
+    'select': PRODUCT_EXTRACTION_PLAN.evaluate_select,
+}
+
+def load_fixture_pages(fixtures_dir: str) -> List[Tuple[str, bytes]]:
+    """ディレクトリ内のHTMLファイルを (ファイル名, 内容) のリストで読み込む"""
+    return [(path.name, path.read_bytes()) for path in sorted(Path(fixtures_dir).glob("*.html"))]
+
+def run_benchmark(pages: List[Tuple[str, bytes]], backend: str, method: str, repeat: int) -> float:
+    """解析から商品情報の抽出までを繰り返し、ページ/秒を返す"""
+    scraper = OkusuriScraper(parser=backend)
+    evaluate = EXTRACTION_METHODS[method]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, content in pages:
+            scraper.product_from_matches(evaluate(scraper.parse_html(content)), name)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed if elapsed > 0 else float('inf')
+
+def check_consistency(pages: List[Tuple[str, bytes]], backend: str) -> List[str]:
+    """抽出プランとselect_one()で抽出結果が一致しないページ名を返す"""
+    scraper = OkusuriScraper(parser=backend)
+    mismatched = []
+    for name, content in pages:
+        soup = scraper.parse_html(content)
+        plan_product = scraper.product_from_matches(EXTRACTION_METHODS['plan'](soup), name)
+        select_product = scraper.product_from_matches(EXTRACTION_METHODS['select'](soup), name)
+        if (asdict(plan_product) if plan_product else None) != (asdict(select_product) if select_product else None):
+            mismatched.append(name)
+    return mismatched
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="HTMLパーサーのマイクロベンチマーク")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="商品ページHTMLのディレクトリ")
+    parser.add_argument("--repeat", type=int, default=20, help="全ページを処理する回数")
+    args = parser.parse_args()
+
+    pages = load_fixture_pages(args.fixtures)
+    if not pages:
+        print(f"❌ HTMLファイルが見つかりません: {args.fixtures}")
+        return
+
+    backends = ['html.parser'] + (['lxml'] if LXML_AVAILABLE else [])
+    print(f"📄 {len(pages)} ページ × {args.repeat} 回")
+    print(f"{'backend':<12} {'method':<8} {'pages/sec':>10}")
+    print("-" * 32)
+    for backend in backends:
+        mismatched = check_consistency(pages, backend)
+        if mismatched:
+            print(f"⚠️ {backend}: 抽出プランとselect_one()の結果が異なります: {mismatched}")
+        for method in EXTRACTION_METHODS:
+            pages_per_sec = run_benchmark(pages, backend, method, args.repeat)
+            print(f"{backend:<12} {method:<8} {pages_per_sec:>10.1f}")
+    if not LXML_AVAILABLE:
+        print("ℹ️ lxmlをインストールするとlxmlバックエンドも計測できます")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+商品カタログストアと軽量な検索結果表現
+検索結果は行番号とスコアの配列だけを持ち、商品フィールドは表示時にカタログから参照する
+"""
+import csv
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple, Union
+
+import numpy as np
+
+# CSV列名 → カタログ内部のフィールド名
+CSV_FIELD_MAP = {
+    'product_name': '商品名',
+    'effect': '効果',
+    'ingredient': '有効成分',
+    'category': 'カテゴリ名',
+    'subcategory': 'サブカテゴリ名',
+    'description': '説明文',
+    'url': '商品URL',
+    'keywords': '検索キーワード',
+    'image_url': '商品画像URL',
+}
+
+class ProductCatalog:
+    """列指向で保持する共有の商品カタログ"""
+
+    __slots__ = ('columns', 'size')
+
+    def __init__(self, columns: Dict[str, List[str]]):
+        self.columns = columns
+        self.size = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> 'ProductCatalog':
+        """product_recommend.csv形式のCSVからカタログを作成"""
+        columns = {field: [] for field in CSV_FIELD_MAP}
+        with open(csv_path, 'r', encoding='utf-8-sig') as file:
+            for row in csv.DictReader(file):
+                for field, csv_column in CSV_FIELD_MAP.items():
+                    columns[field].append(row.get(csv_column) or '')
+        return cls(columns)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> 'ProductCatalog':
+        """メタデータ辞書のリストからカタログを作成"""
+        fields = []
+        for record in records:
+            for field in record:
+                if field not in fields:
+                    fields.append(field)
+        columns = {field: [record.get(field) or '' for record in records] for field in fields}
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def get(self, row_id: int, field: str, default: str = '') -> str:
+        """指定行のフィールド値を取得"""
+        column = self.columns.get(field)
+        if column is None:
+            return default
+        return column[row_id]
+
+    def column(self, field: str) -> List[str]:
+        """列全体を取得（存在しない列は空文字列の列）"""
+        column = self.columns.get(field)
+        if column is None:
+            return [''] * self.size
+        return column
+
+class ResultRow:
+    """検索結果1件分のビュー（フィールドはアクセス時にカタログから参照）"""
+
+    __slots__ = ('catalog', 'row_id', 'similarity_score')
+
+    def __init__(self, catalog: ProductCatalog, row_id: int, similarity_score: float = 0.0):
+        self.catalog = catalog
+        self.row_id = row_id
+        self.similarity_score = similarity_score
+
+    @property
+    def product_name(self) -> str:
+        return self.catalog.get(self.row_id, 'product_name')
+
+    @property
+    def effect(self) -> str:
+        return self.catalog.get(self.row_id, 'effect')
+
+    @property
+    def ingredient(self) -> str:
+        return self.catalog.get(self.row_id, 'ingredient')
+
+    @property
+    def category(self) -> str:
+        return self.catalog.get(self.row_id, 'category')
+
+    @property
+    def description(self) -> str:
+        return self.catalog.get(self.row_id, 'description')
+
+    @property
+    def url(self) -> str:
+        return self.catalog.get(self.row_id, 'url')
+
+    @property
+    def image_url(self) -> str:
+        return self.catalog.get(self.row_id, 'image_url')
+
+    @property
+    def price(self) -> Optional[str]:
+        return self.catalog.get(self.row_id, 'price', None)
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """表示用の追加情報（効果・有効成分・画像URL）"""
+        return {
+            'effect': self.effect,
+            'ingredient': self.ingredient,
+            'image_url': self.image_url
+        }
+
+    def __repr__(self) -> str:
+        return f"ResultRow(row_id={self.row_id}, product_name={self.product_name!r}, similarity_score={self.similarity_score})"
+
+class RankedResults:
+    """行番号とスコアの配列で表す検索結果リスト"""
+
+    __slots__ = ('catalog', 'row_ids', 'scores')
+
+    def __init__(self, catalog: ProductCatalog, row_ids: Iterable[int], scores: Iterable[float]):
+        self.catalog = catalog
+        self.row_ids = np.asarray(row_ids, dtype=np.int64).reshape(-1)
+        self.scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+
+    @classmethod
+    def empty(cls, catalog: ProductCatalog) -> 'RankedResults':
+        return cls(catalog, [], [])
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __bool__(self) -> bool:
+        return len(self.row_ids) > 0
+
+    def __iter__(self) -> Iterator[ResultRow]:
+        for row_id, score in zip(self.row_ids.tolist(), self.scores.tolist()):
+            yield ResultRow(self.catalog, row_id, score)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[ResultRow, 'RankedResults']:
+        if isinstance(key, slice):
+            return RankedResults(self.catalog, self.row_ids[key], self.scores[key])
+        return ResultRow(self.catalog, int(self.row_ids[key]), float(self.scores[key]))
+
+    def sorted_by_score(self) -> 'RankedResults':
+        """スコアの降順に並べ替え（同点は元の順序を維持）"""
+        order = np.argsort(-self.scores, kind='stable')
+        return RankedResults(self.catalog, self.row_ids[order], self.scores[order])
+
+    def with_scores(self, scores: Iterable[float]) -> 'RankedResults':
+        """同じ行でスコアだけを差し替えた結果を返す"""
+        return RankedResults(self.catalog, self.row_ids, scores)
+
+    def unique_by(self, field: str) -> 'RankedResults':
+        """指定フィールドの値が最初に現れた行だけを残す"""
+        column = self.catalog.column(field)
+        seen = set()
+        keep = []
+        for position, row_id in enumerate(self.row_ids.tolist()):
+            value = column[row_id]
+            if value not in seen:
+                seen.add(value)
+                keep.append(position)
+        return RankedResults(self.catalog, self.row_ids[keep], self.scores[keep])
+
+class ResultCursor:
+    """ページ単位で表示する検索結果カーソル
+
+    セッションにはクエリキーと行番号・スコア配列（共有カタログへの参照付き）
+    だけを保存し、表示する件数をページサイズずつ増やしていく。
+    """
+
+    __slots__ = ('query_key', 'results', 'page_size', 'visible')
+
+    def __init__(self, query_key: Any, results: RankedResults, page_size: int = 5):
+        self.query_key = query_key
+        self.results = results
+        self.page_size = max(1, page_size)
+        self.visible = min(self.page_size, len(results))
+
+    @property
+    def total(self) -> int:
+        return len(self.results)
+
+    @property
+    def has_more(self) -> bool:
+        return self.visible < self.total
+
+    def covers(self, query_key: Tuple[str, int]) -> bool:
+        """(クエリ, 最大件数) のキーに対する結果をこのカーソルから切り出せるか
+
+        同じクエリで、最大件数が前回以下か前回の結果が上限に達していなければ
+        再検索せずに済む。
+        """
+        query, max_results = query_key
+        previous_query, previous_max = self.query_key
+        if query != previous_query:
+            return False
+        return max_results <= previous_max or self.total < previous_max
+
+    def visible_results(self) -> RankedResults:
+        """表示済みページ分の結果"""
+        return self.results[:self.visible]
+
+    def show_more(self):
+        """次のページを表示対象に加える"""
+        self.visible = min(self.visible + self.page_size, self.total)
@@ -8,7 +8,10 @@ from dataclasses import dataclass
 from enum import Enum
 import re
 
-from src.faiss_rag_system import FAISSRAGSystem, SearchResult
+import numpy as np
+
+from src.faiss_rag_system import FAISSRAGSystem
+from src.product_catalog import RankedResults
 from config.settings import get_settings
 
 settings = get_settings()
@@ -126,6 +129,9 @@ class QueryAnalyzer:
 class RecommendationEngine:
     """メインのレコメンドエンジン"""
     
+    # キーワードヒット時の倍率（FAISSRAGSystem.SCORE_FIELDSの順: 商品名, 説明文, カテゴリ）
+    KEYWORD_BOOSTS = np.array([1.2, 1.1, 1.15])
+    
     def __init__(self):
         self.rag_system = FAISSRAGSystem()
         # インデックスをロードまたは作成
@@ -137,7 +143,7 @@ class RecommendationEngine:
         user_query: str,
         max_results: int = 5,
         user_context: Optional[Dict[str, Any]] = None
-    ) -> Tuple[List[SearchResult], RecommendationContext]:
+    ) -> Tuple[RankedResults, RecommendationContext]:
         """商品をレコメンド"""
         try:
             # クエリを解析
@@ -161,7 +167,7 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """クエリタイプに応じた検索戦略を実行"""
         if context.query_type == QueryType.SYMPTOM:
             return self._search_by_symptom(context, max_results)
@@ -178,14 +184,13 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """症状ベースの検索"""
         # 症状に対応する商品カテゴリを推定
         enhanced_query = f"{context.user_query} 薬 治療"
         
-        return self.rag_system.get_recommendations(
+        return self.rag_system.search_ranked(
             enhanced_query,
-            context="症状に効果的な医薬品を探しています",
             top_k=max_results
         )
     
@@ -193,9 +198,9 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """商品名ベースの検索"""
-        return self.rag_system.search_products(
+        return self.rag_system.search_ranked(
             context.user_query,
             top_k=max_results
         )
@@ -204,10 +209,10 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """カテゴリベースの検索"""
         # FAISS版では単純な検索を実行（フィルタリング機能は後で実装）
-        return self.rag_system.search_products(
+        return self.rag_system.search_ranked(
             context.user_query,
             top_k=max_results
         )
@@ -216,11 +221,11 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """成分ベースの検索"""
         enhanced_query = f"{context.user_query} 成分 配合"
         
-        return self.rag_system.search_products(
+        return self.rag_system.search_ranked(
             enhanced_query,
             top_k=max_results
         )
@@ -229,59 +234,55 @@ class RecommendationEngine:
         self, 
         context: RecommendationContext, 
         max_results: int
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """一般的な検索"""
-        return self.rag_system.search_products(
+        return self.rag_system.search_ranked(
             context.user_query,
             top_k=max_results
         )
     
     def _post_process_results(
         self, 
-        results: List[SearchResult], 
+        results: RankedResults, 
         context: RecommendationContext
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """結果の後処理"""
         if not results:
             return results
         
         # 重複除去
-        seen_products = set()
-        filtered_results = []
-        
-        for result in results:
-            if result.product_name not in seen_products:
-                seen_products.add(result.product_name)
-                filtered_results.append(result)
+        filtered_results = results.unique_by('product_name')
         
         # スコア調整
         adjusted_results = self._adjust_scores(filtered_results, context)
         
         # スコア順でソート
-        adjusted_results.sort(key=lambda x: x.similarity_score, reverse=True)
-        
-        return adjusted_results
+        return adjusted_results.sorted_by_score()
     
     def _adjust_scores(
         self, 
-        results: List[SearchResult], 
+        results: RankedResults, 
         context: RecommendationContext
-    ) -> List[SearchResult]:
+    ) -> RankedResults:
         """コンテキストに基づいてスコアを調整"""
-        for result in results:
-            # キーワードマッチによるブースト
-            for keyword in context.extracted_keywords:
-                if keyword.lower() in result.product_name.lower():
-                    result.similarity_score *= 1.2
-                if keyword.lower() in (result.description or "").lower():
-                    result.similarity_score *= 1.1
-                if keyword.lower() in (result.category or "").lower():
-                    result.similarity_score *= 1.15
-            
-            # スコアを0-1の範囲に正規化
-            result.similarity_score = min(1.0, result.similarity_score)
+        if not results:
+            return results
+        
+        scores = results.scores.copy()
+        
+        # キーワードマッチによるブースト（フィールドごとのヒット数だけ倍率を掛ける）
+        if context.extracted_keywords:
+            hits = np.stack([
+                self.rag_system.keyword_field_hits(keyword)
+                for keyword in context.extracted_keywords
+            ])
+            hit_counts = hits[:, :, results.row_ids].sum(axis=0)
+            scores *= np.prod(np.power(self.KEYWORD_BOOSTS[:, None], hit_counts), axis=0)
+        
+        # スコアを0-1の範囲に正規化
+        np.minimum(scores, 1.0, out=scores)
         
-        return results
+        return results.with_scores(scores)
     
     def get_system_status(self) -> Dict[str, Any]:
         """システム状態を取得"""
@@ -3,15 +3,25 @@
 商品情報を取得するためのスクレイピング機能
 """
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import time
 import json
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple
+from dataclasses import dataclass, asdict, field
+from email.utils import parsedate_to_datetime
 import logging
 from urllib.parse import urljoin, urlparse
 import re
 
+from src.http_cache import HTTPCache
+from src.extraction_plan import PRODUCT_EXTRACTION_PLAN, resolve_parser_backend
+from src.crawl_frontier import CrawlFrontier
+from src.sitemap_discovery import SitemapDiscovery, SitemapResult, parse_lastmod
 from config.settings import get_settings
 
 settings = get_settings()
@@ -20,6 +30,19 @@ settings = get_settings()
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
+# リトライ対象のステータスコードと例外
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+# サイトマップのlastmodの基準値（前回完了したクロールで確認した最新のlastmod）を保存するキー
+SITEMAP_WATERMARK_KEY = 'sitemap_newest_lastmod'
+# 実行中のクロールで確認した最新のlastmod（クロール完了時に基準値へ反映する）
+SITEMAP_CRAWL_LASTMOD_KEY = 'sitemap_crawl_lastmod'
+
 @dataclass
 class Product:
     """商品データクラス"""
@@ -31,31 +54,331 @@ class Product:
     ingredients: Optional[str] = None
     usage: Optional[str] = None
     image_url: Optional[str] = None
+    unchanged: bool = False  # 前回取得時から未変更（304応答）
+
+@dataclass
+class PageFetch:
+    """ページ取得結果"""
+    url: str
+    content: bytes
+    status_code: int
+    unchanged: bool = False  # キャッシュを304応答で再検証した
+
+@dataclass
+class ScraperStats:
+    """ページ取得の統計"""
+    requests: int = 0
+    pages: int = 0  # 取得できたページ数（304応答を含む）
+    not_modified: int = 0
+    bytes: int = 0  # 受信した本文のバイト数（304応答は0）
+    errors: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    latencies: List[float] = field(default_factory=list)  # リクエストごとの応答時間（秒）
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """応答時間のパーセンタイル（最近傍順位法、計測なしならNone）"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(1, int(-(-percentile * len(ordered) // 100)))
+        return ordered[min(rank, len(ordered)) - 1]
+    
+    @property
+    def latency_p50(self) -> Optional[float]:
+        return self.latency_percentile(50)
+    
+    @property
+    def latency_p95(self) -> Optional[float]:
+        return self.latency_percentile(95)
+
+# NDJSONの書き込み完了を示すファイルの接尾辞（「<ファイル名>.done」）
+NDJSON_DONE_SUFFIX = '.done'
+
+def ndjson_done_path(filepath: str) -> str:
+    """NDJSONの書き込み完了フラグのパス"""
+    return filepath + NDJSON_DONE_SUFFIX
+
+class NDJSONProductSink:
+    """取得した商品を1行ずつNDJSONファイルに書き込むシンク
+
+    1商品を1回のwriteで書き込むため、書き込み中のファイルをtailしても
+    途中の行が読まれるのは最終行だけになる。
+    開くと完了フラグ（<ファイル名>.done）を削除し、close()で作成する。
+    """
+    
+    def __init__(self, filepath: str, flush_every: int = 10, append: bool = False):
+        self.filepath = filepath
+        self.flush_every = max(1, flush_every)
+        self.count = 0
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        done_path = ndjson_done_path(filepath)
+        if os.path.exists(done_path):
+            os.remove(done_path)
+        self._file = open(filepath, 'a' if append else 'w', encoding='utf-8')
+    
+    def write(self, product: Product):
+        """商品を1行追記（flush_every件ごとにフラッシュ）"""
+        self._file.write(json.dumps(asdict(product), ensure_ascii=False) + '\n')
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+    
+    def close(self):
+        """残りを書き込んで閉じ、完了フラグを作成（失敗時も読み手が待ち続けないように作成する）"""
+        self._file.flush()
+        self._file.close()
+        open(ndjson_done_path(self.filepath), 'w').close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def iter_ndjson_products(filepath: str, follow: bool = False, poll_interval: float = 1.0) -> Iterator[Dict]:
+    """NDJSONファイルから商品を1件ずつ読み込む
+
+    follow=Trueの場合はファイル末尾に到達しても終了せず、スクレイパーが
+    追記した行を待ち続ける（改行で終わっていない書き込み途中の行は読み飛ばさず待つ）。
+    NDJSONProductSinkの完了フラグが作成された後、残りの行を読み終えたら終了する。
+    """
+    done_path = ndjson_done_path(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer = ''
+        done = False
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow or done:
+                    break
+                # 完了フラグは最後の行の書き込み後に作られるため、確認後にもう一度末尾まで読む
+                done = os.path.exists(done_path)
+                if not done:
+                    time.sleep(poll_interval)
+                continue
+            buffer += line
+            if not buffer.endswith('\n'):
+                if follow and not done:
+                    continue
+            record = buffer.strip()
+            buffer = ''
+            if record:
+                yield json.loads(record)
+
+class HostRateLimiter:
+    """ホストごとに最小リクエスト間隔を守らせるレートリミッター
+
+    複数スレッドから呼ばれても、同一ホストへのリクエスト開始時刻は
+    min_interval秒以上の間隔に割り当てられる。
+    """
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url: str):
+        """urlのホストに次のリクエストを送ってよい時刻まで待機"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
 
 class OkusuriScraper:
     """お薬通販部スクレイパー"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        request_delay: Optional[float] = None,
+        http_cache: Optional[HTTPCache] = None,
+        skip_unchanged: bool = False,
+        parser: Optional[str] = None,
+        discovery: Optional[str] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        max_retries: Optional[int] = None
+    ):
+        self.base_url = base_url or settings.OKUSURI_BASE_URL
+        self.parser = resolve_parser_backend(parser or settings.HTML_PARSER)
+        # 商品リンクの収集方法: sitemap / category / auto（サイトマップがなければカテゴリページ）
+        self.discovery = discovery or settings.SCRAPER_DISCOVERY
+        if self.discovery not in ('auto', 'sitemap', 'category'):
+            raise ValueError(f"未対応の商品リンク収集方法です: {self.discovery}")
+        self.last_sitemap_result: Optional[SitemapResult] = None
+        self.concurrency = max(1, concurrency or settings.SCRAPER_CONCURRENCY)
+        self.rate_limiter = HostRateLimiter(
+            settings.REQUEST_DELAY if request_delay is None else request_delay
+        )
+        # (接続タイムアウト, 読み込みタイムアウト) 秒。応答しないページでクロール全体が止まらないようにする
+        self.timeout = timeout or (settings.REQUEST_CONNECT_TIMEOUT, settings.REQUEST_READ_TIMEOUT)
+        # 5xx/429・接続エラー・タイムアウト時のリトライ回数（指数バックオフ＋ジッター）
+        self.max_retries = settings.REQUEST_MAX_RETRIES if max_retries is None else max(0, max_retries)
+        self.backoff_base = settings.RETRY_BACKOFF_BASE
+        self.backoff_max = settings.RETRY_BACKOFF_MAX
+        
+        # 並列取得のスレッド間で共有するセッション（接続プールを同時接続数に合わせる）
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': settings.USER_AGENT
         })
-        self.base_url = settings.OKUSURI_BASE_URL
+        self._pool_size = 0
+        self._pool_lock = threading.Lock()
+        self._ensure_pool_size(self.concurrency)
         
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """ページを取得してBeautifulSoupオブジェクトを返す"""
+        # 条件付きGET用のキャッシュ（未指定なら毎回全件取得）
+        self.http_cache = http_cache
+        # Trueなら未変更の商品ページは解析せず、unchanged_urlsに記録するだけにする
+        self.skip_unchanged = skip_unchanged
+        self.unchanged_urls = set()
+        
+        # 取得統計（並列取得のスレッドから更新されるのでロックで保護）
+        self.stats = ScraperStats()
+        self._stats_lock = threading.Lock()
+    
+    def _ensure_pool_size(self, concurrency: int):
+        """接続プールを同時接続数以上にする（呼び出しごとのconcurrencyが大きい場合は作り直す）
+        
+        プールより多いスレッドで取得すると、返却時に溢れた接続が破棄され再接続が増える。
+        """
+        with self._pool_lock:
+            if concurrency <= self._pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self._pool_size = concurrency
+    
+    def reset_stats(self):
+        """取得統計をリセット"""
+        with self._stats_lock:
+            self.stats = ScraperStats()
+    
+    def _record_attempt(self, latency: float, retried: bool = False, timed_out: bool = False):
+        """1回のHTTPリクエストの応答時間・リトライを取得統計に反映"""
+        with self._stats_lock:
+            self.stats.latencies.append(latency)
+            if retried:
+                self.stats.retries += 1
+            if timed_out:
+                self.stats.timeouts += 1
+    
+    def _record_fetch(self, page: Optional['PageFetch']):
+        """1リクエスト分の結果を取得統計に反映"""
+        with self._stats_lock:
+            self.stats.requests += 1
+            if page is None:
+                self.stats.errors += 1
+                return
+            self.stats.pages += 1
+            if page.unchanged:
+                self.stats.not_modified += 1
+            else:
+                self.stats.bytes += len(page.content)
+    
+    def fetch_page(self, url: str) -> Optional[PageFetch]:
+        """ページを取得（キャッシュがあれば条件付きGETで未変更ならキャッシュを返す）"""
+        page = self._fetch_page(url)
+        self._record_fetch(page)
+        return page
+    
+    def _fetch_page(self, url: str) -> Optional[PageFetch]:
         try:
-            time.sleep(settings.REQUEST_DELAY)
-            response = self.session.get(url)
+            cached = self.http_cache.get(url) if self.http_cache is not None else None
+            headers = HTTPCache.conditional_headers(cached)
+            response = None
+            error = None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    time.sleep(self._backoff_delay(attempt, response))
+                self.rate_limiter.wait(url)
+                retriable = attempt < self.max_retries
+                start = time.perf_counter()
+                try:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                except RETRY_EXCEPTIONS as e:
+                    self._record_attempt(
+                        time.perf_counter() - start,
+                        retried=retriable,
+                        timed_out=isinstance(e, requests.exceptions.Timeout)
+                    )
+                    response = None
+                    error = e
+                    continue
+                if response.status_code in RETRY_STATUS_CODES:
+                    self._record_attempt(time.perf_counter() - start, retried=retriable)
+                    error = f"HTTP {response.status_code}"
+                    continue
+                self._record_attempt(time.perf_counter() - start)
+                break
+            else:
+                logger.error(f"ページ取得エラー {url}: {error}（{self.max_retries}回リトライ後）")
+                return None
+            
+            if response.status_code == 304 and cached is not None:
+                self.http_cache.touch(url)
+                return PageFetch(url=url, content=cached.content, status_code=304, unchanged=True)
+            
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            if self.http_cache is not None:
+                self.http_cache.store(
+                    url,
+                    response.content,
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+            return PageFetch(url=url, content=response.content, status_code=response.status_code)
         except Exception as e:
             logger.error(f"ページ取得エラー {url}: {e}")
             return None
     
+    def _backoff_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """リトライ前の待機時間（指数バックオフのフルジッター、Retry-Afterがあればそれ以上待つ）"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+        retry_after = self._retry_after(response) if response is not None else None
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, self.backoff_max)
+    
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Retry-Afterヘッダー（秒数またはHTTP日付）を待機秒数に変換"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at is None:
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+    
+    def get_page(self, url: str) -> Optional[BeautifulSoup]:
+        """ページを取得してBeautifulSoupオブジェクトを返す"""
+        page = self.fetch_page(url)
+        if not page:
+            return None
+        return self.parse_html(page.content)
+    
+    def parse_html(self, content: bytes) -> BeautifulSoup:
+        """設定されたパーサーバックエンドでHTMLを解析"""
+        return BeautifulSoup(content, self.parser)
+    
     def extract_product_links(self, soup: BeautifulSoup) -> List[str]:
         """商品ページのリンクを抽出"""
         product_links = []
+        seen_links = set()
         
         # 商品リンクを探す（実際のサイト構造に応じて調整が必要）
         # 一般的なパターンを想定
@@ -72,68 +395,57 @@ class OkusuriScraper:
                 href = link.get('href')
                 if href:
                     full_url = urljoin(self.base_url, href)
-                    if full_url not in product_links:
+                    if full_url not in seen_links:
+                        seen_links.add(full_url)
                         product_links.append(full_url)
         
         return product_links
     
     def extract_product_info(self, soup: BeautifulSoup, url: str) -> Optional[Product]:
-        """商品詳細情報を抽出"""
+        """商品詳細情報を抽出（全フィールドのセレクタを1回のツリー走査で評価）"""
+        return self.product_from_matches(PRODUCT_EXTRACTION_PLAN.evaluate(soup), url)
+    
+    def product_from_matches(self, matches: Dict[str, List], url: str) -> Optional[Product]:
+        """抽出プランの評価結果（フィールドごとのセレクタ一致要素）から商品情報を作成"""
         try:
             # 商品名を抽出
-            name_selectors = ['h1', '.product-title', '.item-title', 'title']
             name = None
-            for selector in name_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    name = element.get_text(strip=True)
-                    break
+            element = self._first_match(matches['name'])
+            if element:
+                name = element.get_text(strip=True)
             
             if not name:
                 logger.warning(f"商品名が見つかりません: {url}")
                 return None
             
             # 価格を抽出
-            price_selectors = ['.price', '.product-price', '[class*="price"]']
             price = None
-            for selector in price_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    price_text = element.get_text(strip=True)
-                    # 価格の数字部分を抽出
-                    price_match = re.search(r'[\d,]+', price_text)
-                    if price_match:
-                        price = price_match.group()
-                    break
+            element = self._first_match(matches['price'])
+            if element:
+                price_text = element.get_text(strip=True)
+                # 価格の数字部分を抽出
+                price_match = re.search(r'[\d,]+', price_text)
+                if price_match:
+                    price = price_match.group()
             
             # 商品説明を抽出
-            desc_selectors = ['.description', '.product-description', '.item-desc']
             description = None
-            for selector in desc_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description = element.get_text(strip=True)[:500]  # 最初の500文字
-                    break
+            element = self._first_match(matches['description'])
+            if element:
+                description = element.get_text(strip=True)[:500]  # 最初の500文字
             
             # カテゴリを抽出
-            category_selectors = ['.category', '.breadcrumb', '.product-category']
             category = None
-            for selector in category_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    category = element.get_text(strip=True)
-                    break
+            element = self._first_match(matches['category'])
+            if element:
+                category = element.get_text(strip=True)
             
-            # 画像URLを抽出
-            image_selectors = ['.product-image img', '.item-image img', 'img[alt*="商品"]']
+            # 画像URLを抽出（src属性のない要素は次の候補へ）
             image_url = None
-            for selector in image_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    src = element.get('src')
-                    if src:
-                        image_url = urljoin(url, src)
-                        break
+            for element in matches['image']:
+                if element is not None and element.get('src'):
+                    image_url = urljoin(url, element.get('src'))
+                    break
             
             return Product(
                 name=name,
@@ -148,6 +460,11 @@ class OkusuriScraper:
             logger.error(f"商品情報抽出エラー {url}: {e}")
             return None
     
+    @staticmethod
+    def _first_match(elements):
+        """優先順位の高いセレクタから最初に見つかった要素"""
+        return next((element for element in elements if element is not None), None)
+    
     def scrape_category_page(self, category_url: str) -> List[str]:
         """カテゴリページから商品リンクを取得"""
         soup = self.get_page(category_url)
@@ -158,70 +475,194 @@ class OkusuriScraper:
     
     def scrape_product(self, product_url: str) -> Optional[Product]:
         """単一商品の詳細情報を取得"""
-        soup = self.get_page(product_url)
-        if not soup:
+        page = self.fetch_page(product_url)
+        if not page:
             return None
         
-        return self.extract_product_info(soup, product_url)
+        if page.unchanged:
+            self.unchanged_urls.add(product_url)
+            if self.skip_unchanged:
+                return None
+        
+        product = self.extract_product_info(self.parse_html(page.content), product_url)
+        if product:
+            product.unchanged = page.unchanged
+        return product
     
-    def scrape_products(self, max_products: int = 100) -> List[Product]:
-        """複数商品の情報を取得"""
-        products = []
+    def discover_product_links(self, concurrency: Optional[int] = None, since=None) -> List[str]:
+        """設定された収集方法で商品リンクを収集
+
+        サイトマップを使う場合はlastmodがsinceより新しい商品だけを返し、
+        結果（最新のlastmodを含む）をlast_sitemap_resultに保持する。
+        """
+        self.last_sitemap_result = None
+        if self.discovery in ('auto', 'sitemap'):
+            result = self.discover_from_sitemap(since)
+            if result.sitemap_found or self.discovery == 'sitemap':
+                self.last_sitemap_result = result
+                return result.urls
+            logger.info("サイトマップが見つからないためカテゴリページから商品リンクを収集します")
+        return self.discover_from_categories(concurrency)
+    
+    def discover_from_sitemap(self, since=None) -> SitemapResult:
+        """robots.txtとサイトマップから商品リンクを収集"""
+        discovery = SitemapDiscovery(self.fetch_page, self.base_url, user_agent=settings.USER_AGENT)
+        return discovery.discover(since)
+    
+    def discover_from_categories(self, concurrency: Optional[int] = None) -> List[str]:
+        """メインページと上位カテゴリページから商品リンクを収集"""
+        concurrency = max(1, concurrency or self.concurrency)
         
         # メインページから開始
         soup = self.get_page(self.base_url)
         if not soup:
             logger.error("メインページの取得に失敗しました")
-            return products
+            return []
         
         # 商品リンクを取得
         product_links = self.extract_product_links(soup)
         
         # カテゴリページも探索
+        category_urls = []
         category_selectors = ['a[href*="/category/"]', 'a[href*="/categories/"]']
         for selector in category_selectors:
             category_links = soup.select(selector)
             for link in category_links[:5]:  # 最初の5カテゴリ
                 href = link.get('href')
                 if href:
-                    category_url = urljoin(self.base_url, href)
-                    category_product_links = self.scrape_category_page(category_url)
-                    product_links.extend(category_product_links)
+                    category_urls.append(urljoin(self.base_url, href))
         
-        # 重複を除去
-        product_links = list(set(product_links))
+        for category_product_links in self._map(self.scrape_category_page, category_urls, concurrency):
+            product_links.extend(category_product_links)
         
-        logger.info(f"取得した商品リンク数: {len(product_links)}")
+        # 重複を除去（発見順を維持）
+        return list(dict.fromkeys(product_links))
+    
+    def scrape_products(
+        self,
+        max_products: int = 100,
+        concurrency: Optional[int] = None,
+        frontier: Optional[CrawlFrontier] = None
+    ) -> List[Product]:
+        """複数商品の情報を取得"""
+        return list(self.iter_products(max_products, concurrency, frontier))
+    
+    def scrape_products_to_ndjson(
+        self,
+        filepath: str,
+        max_products: int = 100,
+        concurrency: Optional[int] = None,
+        frontier: Optional[CrawlFrontier] = None,
+        flush_every: int = 10
+    ) -> int:
+        """取得した商品を逐次NDJSONに書き込み、書き込んだ件数を返す
+
+        商品をメモリに溜めないため、クロールの規模に関わらずメモリ使用量は一定で、
+        後続の正規化・インデックス作成はクロール完了を待たずにファイルを読み始められる
+        （iter_ndjson_products(follow=True)は完了フラグで終了する）。
+        新しいクロールではファイルを作り直し、中断したクロールを再開する場合だけ追記する
+        （サイトマップのlastmodで絞り込んだクロールでは、ファイルには更新された商品と
+        前回失敗した商品だけが入る）。
+        """
+        resuming = frontier is not None and frontier.crawl_in_progress()
+        with NDJSONProductSink(filepath, flush_every=flush_every, append=resuming) as sink:
+            for product in self.iter_products(max_products, concurrency, frontier):
+                sink.write(product)
+        logger.info(f"商品データを逐次保存しました: {filepath} ({sink.count}件)")
+        return sink.count
+    
+    def iter_products(
+        self,
+        max_products: int = 100,
+        concurrency: Optional[int] = None,
+        frontier: Optional[CrawlFrontier] = None
+    ) -> Iterator[Product]:
+        """商品情報を取得した順に1件ずつ返す
+
+        concurrencyが2以上の場合はスレッドプールで並列取得する
+        （ホストごとのリクエスト間隔はレートリミッターで維持）。
+        frontierを指定すると取得状態を保存し、前回のクロールが中断されていれば
+        商品リンクの収集を省略して前回の続きから取得する。新しいクロールでは前回失敗した
+        商品ページも取得対象に戻す。サイトマップで収集する場合は前回完了したクロールで
+        確認したlastmodより新しい商品ページだけを取得対象にし、基準のlastmodは
+        全ての取得対象を処理し終えた時点で更新する。
+        商品は呼び出し側が受け取った後に取得完了として記録される。
+        """
+        concurrency = max(1, concurrency or self.concurrency)
+        self.unchanged_urls = set()
+        
+        if frontier is not None and frontier.crawl_in_progress():
+            logger.info(f"前回のクロールを再開します: {frontier.counts('product')}")
+            target_links = frontier.pending('product', limit=max_products)
+        else:
+            since = parse_lastmod(frontier.get_state(SITEMAP_WATERMARK_KEY)) if frontier is not None else None
+            product_links = self.discover_product_links(concurrency, since=since)
+            logger.info(f"取得した商品リンク数: {len(product_links)}")
+            if frontier is None:
+                if not product_links:
+                    return
+                target_links = product_links[:max_products]
+            else:
+                self._record_crawl_lastmod(frontier)
+                queued = frontier.start_crawl(product_links, kind='product')
+                logger.info(f"取得対象の商品リンク数: {queued}（前回失敗した商品リンクを含む）")
+                target_links = frontier.pending('product', limit=max_products)
         
         # 各商品の詳細情報を取得
-        for i, product_url in enumerate(product_links[:max_products]):
-            logger.info(f"商品情報取得中: {i+1}/{min(len(product_links), max_products)}")
+        product_count = 0
+        for i, (product_url, product) in enumerate(zip(target_links, self._map(self.scrape_product, target_links, concurrency))):
+            logger.info(f"商品情報取得中: {i+1}/{len(target_links)}")
             
-            product = self.scrape_product(product_url)
             if product:
-                products.append(product)
+                product_count += 1
+                yield product
+            
+            if frontier is not None:
+                if product or product_url in self.unchanged_urls:
+                    frontier.mark_done(product_url)
+                else:
+                    frontier.mark_failed(product_url)
             
             # 進捗表示
             if (i + 1) % 10 == 0:
-                logger.info(f"取得完了: {len(products)}件")
+                logger.info(f"取得完了: {product_count}件")
         
-        logger.info(f"スクレイピング完了: {len(products)}件の商品情報を取得")
-        return products
+        logger.info(f"スクレイピング完了: {product_count}件の商品情報を取得")
+        if self.unchanged_urls:
+            logger.info(f"前回から未変更の商品ページ: {len(self.unchanged_urls)}件")
+        
+        # max_productsで打ち切った未取得URLが残っていればクロール中のまま次回再開する
+        if frontier is not None and not set(frontier.pending('product')) - set(target_links):
+            self._advance_sitemap_watermark(frontier)
+            frontier.finish_crawl()
+    
+    def _record_crawl_lastmod(self, frontier: CrawlFrontier):
+        """サイトマップで確認した最新のlastmodを、クロール完了まで保留して保存"""
+        result = self.last_sitemap_result
+        newest = result.newest_lastmod if result is not None else None
+        frontier.set_state(SITEMAP_CRAWL_LASTMOD_KEY, newest.isoformat() if newest is not None else '')
+    
+    def _advance_sitemap_watermark(self, frontier: CrawlFrontier):
+        """完了したクロールのlastmodを次回クロールの基準として保存"""
+        newest = parse_lastmod(frontier.get_state(SITEMAP_CRAWL_LASTMOD_KEY))
+        if newest is None:
+            return
+        previous = parse_lastmod(frontier.get_state(SITEMAP_WATERMARK_KEY))
+        if previous is None or newest > previous:
+            frontier.set_state(SITEMAP_WATERMARK_KEY, newest.isoformat())
+    
+    def _map(self, func, urls: List[str], concurrency: int):
+        """URLごとにfuncを適用（concurrency>1ならスレッドプールで並列実行、結果は入力順）"""
+        if concurrency <= 1 or len(urls) <= 1:
+            yield from map(func, urls)
+            return
+        self._ensure_pool_size(concurrency)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scraper") as executor:
+            yield from executor.map(func, urls)
     
     def save_products(self, products: List[Product], filepath: str):
         """商品データをJSONファイルに保存"""
-        data = []
-        for product in products:
-            data.append({
-                'name': product.name,
-                'url': product.url,
-                'price': product.price,
-                'description': product.description,
-                'category': product.category,
-                'ingredients': product.ingredients,
-                'usage': product.usage,
-                'image_url': product.image_url
-            })
+        data = [asdict(product) for product in products]
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
@@ -230,15 +671,17 @@ class OkusuriScraper:
 
 def main():
     """メイン実行関数"""
-    scraper = OkusuriScraper()
+    scraper = OkusuriScraper(http_cache=HTTPCache(settings.HTTP_CACHE_PATH))
     
-    # 商品情報を取得
-    products = scraper.scrape_products(max_products=50)  # テスト用に50件
+    # 商品情報を取得しながら逐次保存（中断した場合は次回実行時に続きから再開）
+    frontier = CrawlFrontier(settings.CRAWL_FRONTIER_PATH)
+    count = scraper.scrape_products_to_ndjson(
+        './data/scraped_products.ndjson',
+        max_products=50,  # テスト用に50件
+        frontier=frontier
+    )
     
-    # データを保存
-    if products:
-        scraper.save_products(products, './data/products.json')
-    else:
+    if not count:
         logger.warning("商品データが取得できませんでした")
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+スクレイパーのスループット計測
+モックストアに対してクロール方式ごとの処理速度（ページ/秒）・受信バイト数・エラー件数を計測する
+"""
+import argparse
+import logging
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from src.crawl_frontier import CrawlFrontier
+from src.http_cache import HTTPCache
+from src.mock_storefront import MockStorefront, MockStorefrontConfig
+from src.scraper import OkusuriScraper
+
+@dataclass
+class BenchmarkResult:
+    """クロール方式ごとの計測結果"""
+    mode: str
+    products: int
+    requests: int
+    pages: int
+    not_modified: int
+    bytes: int
+    errors: int
+    retries: int
+    timeouts: int
+    latency_p50: Optional[float]
+    latency_p95: Optional[float]
+    elapsed: float
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else float('inf')
+
+# 計測するクロール方式: (名前, 収集方法, 並列取得するか, HTTPキャッシュで再クロールするか)
+CRAWL_MODES = [
+    ('sequential', 'category', False, False),
+    ('concurrent', 'category', True, False),
+    ('sitemap', 'sitemap', True, False),
+    ('recrawl-cached', 'category', True, True),
+]
+
+def run_mode(
+    storefront: MockStorefront,
+    mode: str,
+    discovery: str,
+    concurrent: bool,
+    cached: bool,
+    concurrency: int,
+    request_delay: float,
+    max_products: int,
+    work_dir: Path,
+    timeout: Optional[float] = None
+) -> BenchmarkResult:
+    """1つのクロール方式で商品を取得し、取得統計を返す"""
+    http_cache = HTTPCache(str(work_dir / f"{mode}_http_cache.db")) if cached else None
+    scraper = OkusuriScraper(
+        base_url=storefront.url,
+        concurrency=concurrency if concurrent else 1,
+        request_delay=request_delay,
+        http_cache=http_cache,
+        discovery=discovery,
+        timeout=(timeout, timeout) if timeout else None
+    )
+    frontier = CrawlFrontier(str(work_dir / f"{mode}_frontier.db"))
+    try:
+        if cached:
+            # 1回目でキャッシュを作成し、2回目（条件付きGET）を計測
+            scraper.scrape_products(max_products=max_products)
+            scraper.reset_stats()
+
+        start = time.perf_counter()
+        products = scraper.scrape_products(max_products=max_products, frontier=frontier)
+        elapsed = time.perf_counter() - start
+    finally:
+        frontier.close()
+        if http_cache is not None:
+            http_cache.close()
+
+    stats = scraper.stats
+    return BenchmarkResult(
+        mode=mode,
+        products=len(products),
+        requests=stats.requests,
+        pages=stats.pages,
+        not_modified=stats.not_modified,
+        bytes=stats.bytes,
+        errors=stats.errors,
+        retries=stats.retries,
+        timeouts=stats.timeouts,
+        latency_p50=stats.latency_p50,
+        latency_p95=stats.latency_p95,
+        elapsed=elapsed
+    )
+
+def run_benchmark(
+    config: MockStorefrontConfig,
+    concurrency: int = 8,
+    request_delay: float = 0.0,
+    max_products: int = 1000,
+    timeout: Optional[float] = None
+) -> List[BenchmarkResult]:
+    """モックストアを起動し、全クロール方式を計測"""
+    results = []
+    with MockStorefront(config) as storefront, tempfile.TemporaryDirectory() as work_dir:
+        for mode, discovery, concurrent, cached in CRAWL_MODES:
+            results.append(run_mode(
+                storefront, mode, discovery, concurrent, cached,
+                concurrency, request_delay, max_products, Path(work_dir), timeout
+            ))
+    return results
+
+def main():
+    """メイン実行関数"""
+    parser = argparse.ArgumentParser(description="スクレイパーのスループット計測（モックストア使用）")
+    parser.add_argument("--products", type=int, default=200, help="モックストアの商品数")
+    parser.add_argument("--latency", type=float, default=0.02, help="モックストアの応答遅延（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラー応答の割合（0〜1）")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="極端に遅い応答の割合（0〜1）")
+    parser.add_argument("--retry-after", type=int, default=None, help="エラー応答に付けるRetry-After（秒）")
+    parser.add_argument("--no-etag", action="store_true", help="ETagを付与しない")
+    parser.add_argument("--timeout", type=float, default=None, help="接続・読み込みタイムアウト（秒、省略時は設定値）")
+    parser.add_argument("--concurrency", type=int, default=8, help="並列取得時の同時接続数")
+    parser.add_argument("--request-delay", type=float, default=0.0, help="同一ホストへのリクエスト間隔（秒）")
+    args = parser.parse_args()
+
+    # 取得エラーのログで計測結果が埋もれないようにする
+    logging.getLogger('src.scraper').setLevel(logging.CRITICAL)
+
+    config = MockStorefrontConfig(
+        num_products=args.products,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        slow_rate=args.slow_rate,
+        etag=not args.no_etag
+    )
+    print(f"🏪 モックストア: 商品{args.products}件, 遅延{args.latency}秒, エラー率{args.error_rate:.0%}")
+    results = run_benchmark(config, args.concurrency, args.request_delay, max_products=args.products, timeout=args.timeout)
+
+    print(
+        f"{'mode':<16} {'products':>8} {'requests':>8} {'pages/sec':>10} {'KB':>8} {'304':>5} "
+        f"{'errors':>6} {'retries':>7} {'timeouts':>8} {'p50 ms':>7} {'p95 ms':>7} {'sec':>7}"
+    )
+    print("-" * 110)
+    for result in results:
+        p50 = result.latency_p50 * 1000 if result.latency_p50 is not None else 0.0
+        p95 = result.latency_p95 * 1000 if result.latency_p95 is not None else 0.0
+        print(
+            f"{result.mode:<16} {result.products:>8} {result.requests:>8} {result.pages_per_sec:>10.1f} "
+            f"{result.bytes / 1024:>8.1f} {result.not_modified:>5} {result.errors:>6} {result.retries:>7} "
+            f"{result.timeouts:>8} {p50:>7.1f} {p95:>7.1f} {result.elapsed:>7.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
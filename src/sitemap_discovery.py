@@ -0,0 +1,181 @@
+"""
+サイトマップによる商品URLの収集
+robots.txtに記載されたサイトマップ（サイトマップインデックス・gzip圧縮を含む）を読み、
+lastmodが前回クロール以降の商品ページだけを取得対象にする
+"""
+import gzip
+import logging
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List, Optional, Set
+from urllib.parse import urljoin
+from urllib.robotparser import RobotFileParser
+
+logger = logging.getLogger(__name__)
+
+# 商品ページとみなすURLのパス
+PRODUCT_URL_PATTERN = re.compile(r'/(?:merchandise|products|item)/')
+
+# サイトマップインデックスの入れ子の上限（循環参照対策）
+MAX_SITEMAP_DEPTH = 3
+
+@dataclass
+class SitemapEntry:
+    """サイトマップの<url>要素"""
+    url: str
+    lastmod: Optional[datetime] = None
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C Datetime形式のlastmodをUTCのdatetimeに変換（解釈できなければNone）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def _local_name(tag: str) -> str:
+    """名前空間を除いたタグ名"""
+    return tag.rsplit('}', 1)[-1]
+
+def _child_text(element: ET.Element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name:
+            return (child.text or '').strip() or None
+    return None
+
+class SitemapDiscovery:
+    """robots.txtとサイトマップから商品URLを収集する
+
+    fetchには OkusuriScraper.fetch_page のような、URLを受け取り
+    content属性を持つ取得結果（失敗時はNone）を返す関数を渡す。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable,
+        base_url: str,
+        user_agent: str = '*',
+        url_pattern: re.Pattern = PRODUCT_URL_PATTERN
+    ):
+        self.fetch = fetch
+        self.base_url = base_url
+        self.user_agent = user_agent
+        self.url_pattern = url_pattern
+        self.robots: Optional[RobotFileParser] = None
+        self.sitemap_requests = 0
+        self.sitemaps_parsed = 0
+
+    def load_robots(self) -> List[str]:
+        """robots.txtを読み込み、記載されたサイトマップURLを返す（記載がなければ/sitemap.xml）"""
+        robots_url = urljoin(self.base_url, '/robots.txt')
+        page = self.fetch(robots_url)
+        sitemap_urls = []
+        if page is not None:
+            self.robots = RobotFileParser(robots_url)
+            self.robots.parse(page.content.decode('utf-8', errors='replace').splitlines())
+            sitemap_urls = self.robots.site_maps() or []
+        return sitemap_urls or [urljoin(self.base_url, '/sitemap.xml')]
+
+    def iter_entries(self, sitemap_url: str, since: Optional[datetime] = None, depth: int = 0) -> Iterator[SitemapEntry]:
+        """サイトマップ（インデックスなら配下のサイトマップも）の<url>要素を返す
+
+        サイトマップインデックスのlastmodがsince以前の子サイトマップは取得しない。
+        """
+        if depth > MAX_SITEMAP_DEPTH:
+            logger.warning(f"サイトマップの入れ子が深すぎます: {sitemap_url}")
+            return
+        root = self._fetch_xml(sitemap_url)
+        if root is None:
+            return
+
+        if _local_name(root.tag) == 'sitemapindex':
+            for sitemap in root:
+                if _local_name(sitemap.tag) != 'sitemap':
+                    continue
+                loc = _child_text(sitemap, 'loc')
+                if not loc:
+                    continue
+                lastmod = parse_lastmod(_child_text(sitemap, 'lastmod'))
+                if since is not None and lastmod is not None and lastmod <= since:
+                    continue
+                yield from self.iter_entries(urljoin(sitemap_url, loc), since, depth + 1)
+            return
+
+        for url_element in root:
+            if _local_name(url_element.tag) != 'url':
+                continue
+            loc = _child_text(url_element, 'loc')
+            if loc:
+                yield SitemapEntry(url=urljoin(sitemap_url, loc), lastmod=parse_lastmod(_child_text(url_element, 'lastmod')))
+
+    def _fetch_xml(self, url: str) -> Optional[ET.Element]:
+        """サイトマップを取得して解析（.xml.gzはgzip展開）"""
+        page = self.fetch(url)
+        self.sitemap_requests += 1
+        if page is None:
+            return None
+        content = page.content
+        if content[:2] == b'\x1f\x8b':
+            try:
+                content = gzip.decompress(content)
+            except OSError as e:
+                logger.error(f"サイトマップの展開エラー {url}: {e}")
+                return None
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError as e:
+            logger.error(f"サイトマップの解析エラー {url}: {e}")
+            return None
+        self.sitemaps_parsed += 1
+        return root
+
+    def is_product_url(self, url: str) -> bool:
+        """商品ページのURLで、robots.txtで禁止されていないか"""
+        if not self.url_pattern.search(url):
+            return False
+        return self.robots is None or self.robots.can_fetch(self.user_agent, url)
+
+    def discover(self, since: Optional[datetime] = None) -> 'SitemapResult':
+        """lastmodがsinceより新しい（またはlastmodのない）商品URLを収集
+
+        sitemap_foundはサイトマップを1つ以上取得・解析できたか。サイトマップインデックスの
+        lastmodで子サイトマップをすべて省略した（前回から更新がない）場合もTrueになる。
+        """
+        self.sitemap_requests = 0
+        self.sitemaps_parsed = 0
+        urls: List[str] = []
+        seen: Set[str] = set()
+        newest: Optional[datetime] = None
+
+        for sitemap_url in self.load_robots():
+            for entry in self.iter_entries(sitemap_url, since):
+                if entry.url in seen or not self.is_product_url(entry.url):
+                    continue
+                seen.add(entry.url)
+                if entry.lastmod is not None:
+                    newest = entry.lastmod if newest is None else max(newest, entry.lastmod)
+                    if since is not None and entry.lastmod <= since:
+                        continue
+                urls.append(entry.url)
+
+        logger.info(
+            f"サイトマップ {self.sitemap_requests}件から商品URL {len(seen)}件を確認、"
+            f"更新対象 {len(urls)}件"
+        )
+        return SitemapResult(urls=urls, newest_lastmod=newest, sitemap_found=self.sitemaps_parsed > 0)
+
+@dataclass
+class SitemapResult:
+    """サイトマップからの収集結果"""
+    urls: List[str]
+    newest_lastmod: Optional[datetime] = None  # 確認した商品URLのうち最新のlastmod
+    sitemap_found: bool = True
@@ -0,0 +1,108 @@
+"""
+検索ボックスの入力補完（タイプアヘッド）
+商品名・有効成分・サブカテゴリ名・検索キーワードから前方一致インデックスを構築する
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Tuple
+
+from src.product_catalog import ProductCatalog
+
+# 補完候補の元になるフィールドと重み（商品名を最優先）
+SUGGESTION_FIELD_WEIGHTS = {
+    'product_name': 5.0,
+    'ingredient': 3.0,
+    'subcategory': 2.0,
+    'keywords': 1.0,
+}
+
+# カンマ区切りで複数の語を持つフィールド
+MULTI_VALUE_FIELDS = ('ingredient', 'keywords')
+
+# カタカナ → ひらがなの変換表（ァ〜ヶ）
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+def normalize_kana_key(text: str) -> str:
+    """ひらがな/カタカナ・全角/半角・大文字/小文字を区別しない照合キーに変換"""
+    normalized = unicodedata.normalize('NFKC', text).lower()
+    return "".join(normalized.split()).translate(_KATAKANA_TO_HIRAGANA)
+
+class PrefixIndex:
+    """ソート済み配列による重み付き前方一致インデックス
+
+    短い接頭辞は該当範囲が広いので、PRECOMPUTED_PREFIX_LENGTH文字までの
+    接頭辞は上位候補を構築時に計算しておく。
+    """
+
+    # 上位候補を事前計算する接頭辞の最大文字数
+    PRECOMPUTED_PREFIX_LENGTH = 2
+    # 事前計算する候補数（suggestのlimitの上限）
+    MAX_SUGGESTIONS = 10
+
+    __slots__ = ('keys', 'terms', 'weights', '_top_by_prefix')
+
+    def __init__(self, term_weights: Dict[str, float]):
+        # 照合キーが同じ表記ゆれは重みを合算し、最も重い表記を代表にする
+        merged: Dict[str, Tuple[float, float, str]] = {}
+        for term, weight in term_weights.items():
+            key = normalize_kana_key(term)
+            if not key:
+                continue
+            total, best_weight, best_term = merged.get(key, (0.0, -1.0, term))
+            if weight > best_weight:
+                best_weight, best_term = weight, term
+            merged[key] = (total + weight, best_weight, best_term)
+
+        self.keys = sorted(merged)
+        self.terms = [merged[key][2] for key in self.keys]
+        self.weights = [merged[key][0] for key in self.keys]
+        self._top_by_prefix = self._precompute_top()
+
+    @classmethod
+    def from_catalog(cls, catalog: ProductCatalog) -> 'PrefixIndex':
+        """商品カタログから補完候補と人気度（出現商品数×フィールド重み）を集計"""
+        term_weights: Dict[str, float] = {}
+        for field, weight in SUGGESTION_FIELD_WEIGHTS.items():
+            for value in catalog.column(field):
+                terms = value.split(',') if field in MULTI_VALUE_FIELDS else [value]
+                # 同じ商品内の重複キーワードは1回として数える（有効成分の「〜など」は除く）
+                for term in {term.strip().removesuffix('など') for term in terms}:
+                    if term:
+                        term_weights[term] = term_weights.get(term, 0.0) + weight
+        return cls(term_weights)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _precompute_top(self) -> Dict[str, List[int]]:
+        """短い接頭辞ごとの上位候補（インデックス）を計算"""
+        candidates: Dict[str, List[int]] = {}
+        for position, key in enumerate(self.keys):
+            for length in range(1, min(len(key), self.PRECOMPUTED_PREFIX_LENGTH) + 1):
+                candidates.setdefault(key[:length], []).append(position)
+        return {
+            prefix: self._top_positions(positions, self.MAX_SUGGESTIONS)
+            for prefix, positions in candidates.items()
+        }
+
+    def _top_positions(self, positions, limit: int) -> List[int]:
+        """重みの降順（同点は照合キー順）で上位limit件の位置を返す"""
+        return heapq.nsmallest(limit, positions, key=lambda position: (-self.weights[position], position))
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """入力中の文字列に前方一致する補完候補を人気順に返す"""
+        key = normalize_kana_key(prefix)
+        if not key or limit <= 0:
+            return []
+
+        limit = min(limit, self.MAX_SUGGESTIONS)
+        precomputed = self._top_by_prefix.get(key)
+        if precomputed is not None:
+            return [self.terms[position] for position in precomputed[:limit]]
+        if len(key) <= self.PRECOMPUTED_PREFIX_LENGTH:
+            return []
+
+        start = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key + '\U0010ffff', lo=start)
+        return [self.terms[position] for position in self._top_positions(range(start, end), limit)]